@@ -5,7 +5,8 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from src.database import SQLModel
+from src.database import Base
+from src import models  # noqa: F401 регистрирует таблицы в Base.metadata
 from src.config import database_settings
 
 # this is the Alembic Config object, which provides
@@ -23,7 +24,7 @@ config.set_main_option("sqlalchemy.url", database_settings.POSTGRES_URL_asyncpg
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = SQLModel.metadata
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
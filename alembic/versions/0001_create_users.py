@@ -0,0 +1,39 @@
+"""create users
+
+Revision ID: 0001
+Revises: 
+Create Date: 2025-01-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password', sa.LargeBinary(), nullable=False),
+        sa.Column('first_name', sa.String(length=256), nullable=False),
+        sa.Column('is_admin', sa.Boolean(), nullable=True),
+        sa.Column('is_stuff', sa.Boolean(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('UTC', now())"), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('UTC', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('users')
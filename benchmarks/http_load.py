@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import fakeredis
+import httpx
+from fakeredis.aioredis import FakeConnection
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from src.container import BASE_DIR
+
+# Нагрузочный прогон сквозных сценариев авторизации через настоящее ASGI приложение src.main.app.
+# Redis подменяется fakeredis (или используется настоящий через --redis real), письма не уходят
+# по SMTP, а попадают в локальный приемник, база данных берется из env_files/.env.db.
+#
+# Запуск: python -m benchmarks.http_load --users 200 --concurrency 50 --output bench/http.json
+# Сравнение: python -m benchmarks.http_load --compare bench/old.json bench/new.json
+
+# src.main импортирует пакет v1 как модуль верхнего уровня
+sys.path.append(str(BASE_DIR / "src"))
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    errors: int = 0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    def record(self, latency: float, status_code: int | None, is_error: bool) -> None:
+        now = time.perf_counter()
+        if not self.started_at:
+            self.started_at = now - latency
+        self.finished_at = now
+        self.latencies.append(latency)
+        if status_code is not None:
+            self.statuses[status_code] += 1
+        if is_error:
+            self.errors += 1
+
+    def summary(self) -> dict[str, Any]:
+        count = len(self.latencies)
+        if not count:
+            return {"count": 0}
+        ordered = sorted(self.latencies)
+        duration = max(self.finished_at - self.started_at, 1e-9)
+        return {
+            "count": count,
+            "rps": round(count / duration, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+            "error_rate": round(self.errors / count, 4),
+            "statuses": {str(code): amount for code, amount in sorted(self.statuses.items())},
+        }
+
+
+def percentile(ordered: list[float], percent: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+# Локальный приемник писем вместо SMTP: в redis хранится только hmac кода, поэтому коды запоминаются здесь
+class SMTPSink:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.codes: dict[str, str] = {}
+
+    async def send_email_verification_code_async(self, redis_pool: Redis, receiver_email: str, code: str) -> None:
+        self.sent += 1
+        self.codes[receiver_email] = code
+
+    async def send_email_reset_password_async(self, redis_pool: Redis, receiver_email: str, key: str) -> None:
+        self.sent += 1
+
+
+class LoadRunner:
+    def __init__(self, client: httpx.AsyncClient, sink: SMTPSink, concurrency: int, expected: dict[str, int]) -> None:
+        self.client = client
+        self.sink = sink
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.expected = expected
+        self.stats: dict[str, EndpointStats] = defaultdict(EndpointStats)
+
+    async def request(self, name: str, method: str, url: str, **kwargs: Any) -> httpx.Response | None:
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except Exception:
+                self.stats[name].record(time.perf_counter() - started, None, True)
+                return None
+        latency = time.perf_counter() - started
+        self.stats[name].record(latency, response.status_code, response.status_code != self.expected[name])
+        return response
+
+    async def verification_code(self, email: str, password: str) -> str | None:
+        response = await self.request(
+            "POST /v1/email/verification-code", "POST", "/v1/email/verification-code",
+            json={"email": email, "password": password},
+        )
+        if response is None or response.status_code != 200:
+            return None
+        return self.sink.codes.pop(email, None)
+
+    async def signup(self, email: str, password: str) -> httpx.Response | None:
+        code = await self.verification_code(email=email, password=password)
+        if code is None:
+            return None
+        return await self.request(
+            "POST /v1/auth/signup", "POST", "/v1/auth/signup",
+            json={"email": email, "password": password, "first_name": "Bench", "email_code": code},
+        )
+
+    async def login(self, email: str, password: str) -> httpx.Response | None:
+        code = await self.verification_code(email=email, password=password)
+        if code is None:
+            return None
+        return await self.request(
+            "POST /v1/auth/login", "POST", "/v1/auth/login",
+            json={"email": email, "password": password, "email_code": code},
+        )
+
+    async def refresh(self, refresh_token: str) -> None:
+        await self.request("POST /v1/jwt/refresh", "POST", "/v1/jwt/refresh", cookies={"refresh_token": refresh_token})
+
+    async def protected(self, prefix: str, access_token: str) -> None:
+        url = f"/v1/{prefix}/protected"
+        await self.request(f"GET {url}", "GET", url, headers={"Authorization": f"Bearer {access_token}"})
+
+
+def create_privileged_access_token(payload: dict[str, Any]) -> str:
+    from src.v1.jwt.config import jwt_settings
+    from src.v1.jwt.utils import encode_jwt
+
+    # Обычный access токен не содержит флагов admin/stuff, поэтому для /admin и /stuff выпускается свой
+    return encode_jwt(
+        payload={**payload, "admin": True, "stuff": True},
+        expire_timedelta=jwt_settings.access_token_expire_minutes,
+    )
+
+
+async def run_phase(items: list[Any], worker: Callable[[Any], Awaitable[Any]]) -> list[Any]:
+    return await asyncio.gather(*(worker(item) for item in items))
+
+
+def use_fake_redis() -> BlockingConnectionPool:
+    import src.redis_pool
+
+    src.redis_pool.redis_connection_pool = BlockingConnectionPool(
+        server=fakeredis.FakeServer(),
+        connection_class=FakeConnection,
+        decode_responses=True,
+        max_connections=1000,
+    )
+    return src.redis_pool.redis_connection_pool
+
+
+def use_smtp_sink(sink: SMTPSink) -> None:
+    # Роутер может быть загружен дважды (как src.v1 и как v1), подменяются оба модуля
+    for name, module in list(sys.modules.items()):
+        if name.endswith("v1.email.router"):
+            module.send_email_verification_code_async = sink.send_email_verification_code_async
+            module.send_email_reset_password_async = sink.send_email_reset_password_async
+
+
+async def delete_benchmark_users(email_prefix: str) -> None:
+    from sqlalchemy import delete
+
+    from src.database import async_session_factory
+    from src.models import UserModel
+
+    async with async_session_factory() as session:
+        await session.execute(delete(UserModel).where(UserModel.email.startswith(email_prefix)))
+        await session.commit()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    if args.redis == "fake":
+        use_fake_redis()
+
+    from src.config import load_shedding_settings, rate_limit_settings
+    from src.main import app
+    from src.v1.email.codes import verification_code_store
+    from src.v1.jwt.utils import decode_jwt
+
+    sink = SMTPSink()
+    use_smtp_sink(sink)
+    # Один клиент запрашивает коды для signup и login подряд, поэтому пауза между отправками и лимиты
+    # по ip отключаются, если не запрошено иное
+    verification_code_store.resend_cooldown_ms = 0
+    rate_limit_settings.RATE_LIMIT_ENABLED = args.rate_limit
+    load_shedding_settings.LOAD_SHEDDING_ENABLED = args.load_shedding
+
+    email_prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    emails = [f"{email_prefix}{number}@example.com" for number in range(args.users)]
+    password = "benchmark-password"
+    expected = defaultdict(lambda: 200, {"POST /v1/auth/signup": 201})
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://testserver") as client:
+            runner = LoadRunner(client=client, sink=sink, concurrency=args.concurrency, expected=expected)
+
+            await run_phase(emails, lambda email: runner.signup(email=email, password=password))
+            logins = await run_phase(emails, lambda email: runner.login(email=email, password=password))
+
+            sessions: list[tuple[str, str]] = []
+            for response in logins:
+                if response is not None and response.status_code == 200:
+                    access_token = response.headers["Authorization"].split()[-1]
+                    sessions.append((access_token, response.cookies["refresh_token"]))
+
+            await run_phase(
+                [refresh_token for _, refresh_token in sessions] * args.repeat,
+                lambda refresh_token: runner.refresh(refresh_token=refresh_token),
+            )
+            privileged = {
+                access_token: create_privileged_access_token(payload=decode_jwt(access_token))
+                for access_token, _ in sessions
+            }
+            for prefix in ("auth", "admin", "stuff"):
+                await run_phase(
+                    [access_token for access_token, _ in sessions] * args.repeat,
+                    lambda access_token: runner.protected(
+                        prefix=prefix,
+                        access_token=access_token if prefix == "auth" else privileged[access_token],
+                    ),
+                )
+
+        if not args.keep_users:
+            await delete_benchmark_users(email_prefix=email_prefix)
+
+    return {
+        "meta": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "redis": args.redis,
+            "rate_limit": args.rate_limit,
+            "load_shedding": args.load_shedding,
+            "emails_sent": sink.sent,
+            "duration_s": round(time.perf_counter() - started, 3),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "endpoints": {name: stats.summary() for name, stats in sorted(runner.stats.items())},
+    }
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    old = json.loads(old_path.read_text())["endpoints"]
+    new = json.loads(new_path.read_text())["endpoints"]
+    print(f"{'endpoint':40} {'metric':10} {'old':>12} {'new':>12} {'delta':>9}")
+    for name in sorted(set(old) | set(new)):
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms", "error_rate"):
+            before, after = old.get(name, {}).get(metric), new.get(name, {}).get(metric)
+            if before is None or after is None:
+                print(f"{name:40} {metric:10} {str(before):>12} {str(after):>12}")
+                continue
+            delta = (after - before) / before * 100 if before else 0.0
+            print(f"{name:40} {metric:10} {before:>12} {after:>12} {delta:>+8.1f}%")
+
+
+def print_summary(results: dict[str, Any]) -> None:
+    print(f"{'endpoint':40} {'count':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, summary in results["endpoints"].items():
+        if not summary["count"]:
+            continue
+        print(
+            f"{name:40} {summary['count']:>7} {summary['rps']:>9} {summary['p50_ms']:>9} "
+            f"{summary['p95_ms']:>9} {summary['p99_ms']:>9} {summary['error_rate']:>7.2%}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон сценариев авторизации")
+    parser.add_argument("--users", type=int, default=100, help="число пользователей, проходящих signup и login")
+    parser.add_argument("--concurrency", type=int, default=20, help="число одновременных запросов")
+    parser.add_argument("--repeat", type=int, default=10, help="запросов /refresh и /protected на пользователя")
+    parser.add_argument("--redis", choices=("fake", "real"), default="fake")
+    parser.add_argument("--output", type=Path, help="путь для json с результатами")
+    parser.add_argument("--rate-limit", action="store_true", help="не отключать ограничение частоты запросов")
+    parser.add_argument("--load-shedding", action="store_true", help="не отключать сброс нагрузки")
+    parser.add_argument("--keep-users", action="store_true", help="не удалять созданных пользователей")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"), help="сравнить два json файла")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = asyncio.run(run(args))
+    print_summary(results)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
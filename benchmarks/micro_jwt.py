@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import bcrypt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from starlette.responses import JSONResponse
+
+from src.schemas import UserSchema
+from src.v1.jwt import utils
+from src.v1.jwt.keys import create_jwt_key, jwt_key_ring
+
+# Микро-бенчмарки горячего пути JWT и паролей из src/v1/jwt/utils.py.
+# Входные данные, число итераций и стоимость bcrypt зафиксированы, чтобы прогоны были сравнимы.
+#
+# Запуск: python -m benchmarks.micro_jwt
+# Обновить базовую линию: python -m benchmarks.micro_jwt --save-baseline
+# Прогон завершается с кодом 1, если какой-то бенчмарк медленнее базовой линии больше чем на --threshold.
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "micro_jwt.json"
+
+PASSWORD = "benchmark-password"
+USER = UserSchema(
+    id=1,
+    email="bench@example.com",
+    first_name="Bench",
+    is_admin=False,
+    is_stuff=False,
+    is_active=True,
+    created_at=datetime(2025, 1, 1),
+    updated_at=datetime(2025, 1, 1),
+)
+PAYLOAD = {"type": "access", "uid": USER.id, "sub": USER.email, "name": USER.first_name}
+EXPIRE = timedelta(minutes=15)
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], Any]
+    iterations: int
+    setup: Callable[[], contextlib.AbstractContextManager[Any]] = contextlib.nullcontext
+
+
+def generate_private_keys() -> dict[str, Any]:
+    return {
+        "RS256": rsa.generate_private_key(public_exponent=65537, key_size=2048),
+        "ES256": ec.generate_private_key(ec.SECP256R1()),
+        "EdDSA": ed25519.Ed25519PrivateKey.generate(),
+    }
+
+
+@contextlib.contextmanager
+def use_signing_key(private_key: Any) -> Iterator[None]:
+    # Функции create_*_token всегда подписывают ключом из общей связки, поэтому он временно подменяется
+    key = create_jwt_key(public_key=private_key.public_key(), private_key=private_key)
+    previous_signing_key = jwt_key_ring.signing_key
+    jwt_key_ring.signing_key = key
+    jwt_key_ring.verification_keys[key.kid] = key
+    try:
+        yield
+    finally:
+        jwt_key_ring.signing_key = previous_signing_key
+        jwt_key_ring.verification_keys.pop(key.kid, None)
+
+
+def build_cases(bcrypt_rounds: list[int]) -> list[Case]:
+    cases: list[Case] = []
+    for algorithm, private_key in generate_private_keys().items():
+        def signing_key(private_key: Any = private_key) -> contextlib.AbstractContextManager[Any]:
+            return use_signing_key(private_key)
+
+        with use_signing_key(private_key):
+            token = utils.encode_jwt(payload=PAYLOAD, expire_timedelta=EXPIRE)
+
+        def decode_cold(token: str = token) -> None:
+            utils.verified_token_cache.clear()
+            utils.decode_jwt(token=token)
+
+        cases += [
+            Case(f"encode_jwt[{algorithm}]", lambda: utils.encode_jwt(payload=PAYLOAD, expire_timedelta=EXPIRE), 500, signing_key),
+            Case(f"decode_jwt[{algorithm}]", decode_cold, 500, signing_key),
+            Case(f"decode_jwt_cached[{algorithm}]", lambda token=token: utils.decode_jwt(token=token), 5000, signing_key),
+            Case(f"create_access_token[{algorithm}]", lambda: utils.create_access_token(user=USER), 500, signing_key),
+            Case(f"create_refresh_token[{algorithm}]", lambda: utils.create_refresh_token(user=USER), 500, signing_key),
+            Case(
+                f"set_tokens_in_response[{algorithm}]",
+                lambda: utils.set_tokens_in_response(response=JSONResponse(content={"message": "ok"}), user=USER),
+                300,
+                signing_key,
+            ),
+        ]
+
+    cases.append(Case("hash_password[default]", lambda: utils.hash_password(password=PASSWORD), 3))
+    for rounds in bcrypt_rounds:
+        hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds))
+        iterations = max(1, 2 ** (14 - rounds))
+        cases += [
+            Case(
+                f"bcrypt_hash[cost={rounds}]",
+                lambda rounds=rounds: bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)),
+                iterations,
+            ),
+            Case(
+                f"validate_password[cost={rounds}]",
+                lambda hashed=hashed: utils.validate_password(password=PASSWORD, hashed_password=hashed),
+                iterations,
+            ),
+        ]
+    return cases
+
+
+def measure(case: Case, repeats: int) -> dict[str, float]:
+    with case.setup():
+        case.func()
+        best = float("inf")
+        for _ in range(repeats):
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(case.iterations):
+                case.func()
+            best = min(best, time.perf_counter() - started)
+
+        # Аллокации считаются отдельным проходом, чтобы tracemalloc не искажал время
+        iterations = min(case.iterations, 100)
+        gc.collect()
+        gc.disable()
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        for _ in range(iterations):
+            case.func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks_after = sys.getallocatedblocks()
+        gc.enable()
+
+    return {
+        "ops_per_sec": round(case.iterations / best, 2),
+        "us_per_op": round(best / case.iterations * 1_000_000, 3),
+        "alloc_peak_bytes": peak,
+        "retained_blocks_per_op": round((blocks_after - blocks_before) / iterations, 2),
+    }
+
+
+def check_regressions(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["ops_per_sec"] < expected["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: {result['ops_per_sec']} ops/s, базовая линия {expected['ops_per_sec']} ops/s")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Микро-бенчмарки JWT и паролей")
+    parser.add_argument("--repeats", type=int, default=5, help="повторов каждого бенчмарка, берется лучший")
+    parser.add_argument("--bcrypt-rounds", type=int, nargs="+", default=[4, 10, 12])
+    parser.add_argument("--filter", default="", help="запускать только бенчмарки, содержащие подстроку")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление относительно базовой линии")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="путь для json с результатами")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    results: dict[str, dict[str, float]] = {}
+    for case in build_cases(bcrypt_rounds=args.bcrypt_rounds):
+        if args.filter not in case.name:
+            continue
+        results[case.name] = measure(case, repeats=args.repeats)
+        result = results[case.name]
+        print(
+            f"{case.name:40} {result['ops_per_sec']:>12} ops/s {result['us_per_op']:>12} us/op "
+            f"{result['alloc_peak_bytes']:>9} B peak {result['retained_blocks_per_op']:>7} blocks/op"
+        )
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()},
+        "results": results,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2, sort_keys=True))
+        return 0
+
+    if not args.baseline.exists():
+        return 0
+    regressions = check_regressions(results, json.loads(args.baseline.read_text())["results"], args.threshold)
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
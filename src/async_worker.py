@@ -0,0 +1,198 @@
+import asyncio
+import datetime
+import json
+from typing import Any
+
+import aio_pika
+from aio_pika.abc import AbstractExchange, AbstractIncomingMessage
+from redis.asyncio import Redis
+
+from src.container import logger
+from src.redis_pool import close_redis_connection_pool, create_redis_connection_pool
+from src.v1.email.config import email_settings
+from src.v1.email.smtp import AsyncSMTPConnectionPool
+from src.v1.email.tasks import (
+    create_email_message,
+    flush_email_batch,
+    reset_password_email,
+    send_email,
+    send_email_reset_password,
+    send_email_verification_code,
+    verification_code_email,
+)
+from src.worker import app as celery_app
+
+# Асинхронный воркер читает те же сообщения задач celery (протокол v2, json) из очереди rabbitmq
+# и отправляет письма конкурентно через ограниченный набор SMTP соединений.
+# Запуск: python -m src.async_worker
+
+smtp_connection_pool = AsyncSMTPConnectionPool(
+    host=email_settings.smtp_host,
+    port=email_settings.smtp_port,
+    user=email_settings.EMAIL_NAME,
+    password=email_settings.EMAIL_APP_PASSWORD,
+    size=email_settings.async_worker_smtp_connections,
+    max_messages_per_connection=email_settings.smtp_max_messages_per_connection,
+    max_connection_age=email_settings.smtp_max_connection_age.total_seconds(),
+    timeout=email_settings.smtp_timeout,
+)
+
+
+async def send_email_async(
+    receiver_email: str,
+    subject: str,
+    body: str,
+    attachment_path: str | None = None,
+    html: str | None = None,
+) -> bool:
+    msg = create_email_message(
+        receiver_email=receiver_email, subject=subject, body=body, attachment_path=attachment_path, html=html
+    )
+    try:
+        await smtp_connection_pool.sendmail(email_settings.EMAIL_NAME, receiver_email, msg.as_string())
+        logger.info(f"Успешно было отправлено сообщение на почту {receiver_email}")
+        return True
+    except Exception as e:
+        logger.error(f"Произошла ошибка отправки сообщения на почту {receiver_email}:\n{e}")
+        return False
+
+
+async def retry_email_later(**message: str | None) -> None:
+    # Публикация через celery блокирующая, поэтому выполняется вне event loop
+    await asyncio.to_thread(
+        send_email.apply_async,
+        kwargs=message,
+        countdown=email_settings.batch_retry_delay.total_seconds(),
+    )
+
+
+async def flush_email_batch_async() -> None:
+    redis = Redis(connection_pool=create_redis_connection_pool())
+    # Метка снимается до разбора очереди, чтобы письма, добавленные во время отправки, поставили новую задачу
+    await redis.delete(email_settings.batch_scheduled_redis_key)
+    while True:
+        items: list[str] | None = await redis.lpop(email_settings.batch_redis_key, email_settings.batch_size)
+        if not items:
+            break
+        messages: list[dict[str, str | None]] = [json.loads(item) for item in items]
+        results = await asyncio.gather(*(send_email_async(**message) for message in messages))
+        for message, is_sent in zip(messages, results):
+            if not is_sent:
+                await retry_email_later(**message)
+
+
+async def run_task(name: str, args: list[Any], kwargs: dict[str, Any]) -> bool:
+    # Возвращает False для задачи, которую асинхронный воркер не поддерживает
+    if name == send_email_verification_code.name:
+        await send_email_async(receiver_email=kwargs["receiver_email"], **verification_code_email(code=kwargs["code"]))
+    elif name == send_email_reset_password.name:
+        await send_email_async(receiver_email=kwargs["receiver_email"], **reset_password_email(key=kwargs["key"]))
+    elif name == send_email.name:
+        await send_email_async(*args, **kwargs)
+    elif name == flush_email_batch.name:
+        await flush_email_batch_async()
+    else:
+        return False
+    return True
+
+
+def get_delay_queues() -> dict[int, str]:
+    # ttl в мс -> имя очереди ожидания
+    ttls = sorted(round(bucket.total_seconds() * 1000) for bucket in email_settings.async_worker_delay_buckets)
+    return {ttl: f"{email_settings.async_worker_delay_queue}.{ttl}" for ttl in ttls}
+
+
+def get_delay_queue(delay: float) -> str:
+    # Самая длинная задержка, которая не больше оставшейся. Остаток задача дождется в следующих очередях
+    # после возврата, задержка меньше самой короткой округляется до нее
+    delay_queues = get_delay_queues()
+    delay_ms = delay * 1000
+    ttl = max((ttl for ttl in delay_queues if ttl <= delay_ms), default=min(delay_queues))
+    return delay_queues[ttl]
+
+
+def copy_message(message: AbstractIncomingMessage) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=message.body,
+        headers=message.headers,
+        content_type=message.content_type,
+        content_encoding=message.content_encoding,
+        correlation_id=message.correlation_id,
+        reply_to=message.reply_to,
+        priority=message.priority,
+        delivery_mode=message.delivery_mode,
+    )
+
+
+class TaskConsumer:
+    def __init__(self, exchange: AbstractExchange) -> None:
+        self.exchange = exchange
+
+    async def handle_message(self, message: AbstractIncomingMessage) -> None:
+        async with message.process(ignore_processed=True):
+            headers = message.headers
+            name = str(headers.get("task"))
+            eta = headers.get("eta")
+            if eta:
+                delay = (datetime.datetime.fromisoformat(str(eta)) - datetime.datetime.now(datetime.UTC)).total_seconds()
+                if delay > 0:
+                    # Отложенная задача (countdown) не занимает слот prefetch: она переносится в очередь ожидания
+                    # и возвращается в рабочую очередь, когда истечет ttl. Подтверждение после публикации.
+                    await self.exchange.publish(copy_message(message), routing_key=get_delay_queue(delay))
+                    return
+            args, kwargs, _ = json.loads(message.body)
+            if not await run_task(name=name, args=args, kwargs=kwargs):
+                # Задача не теряется: она остается в отдельной очереди для воркера celery или разбора
+                logger.error(f"Асинхронный воркер не поддерживает задачу {name}, она перенесена в очередь "
+                             f"{email_settings.async_worker_dead_letter_queue!r}")
+                await self.exchange.publish(
+                    copy_message(message), routing_key=email_settings.async_worker_dead_letter_queue
+                )
+
+
+def get_broker_connection_params() -> dict[str, Any]:
+    # Тот же брокер, что у celery (src.worker), вместе с учетными данными и vhost по умолчанию kombu
+    with celery_app.connection_for_write() as connection:
+        info = connection.info()
+    return {
+        "host": info["hostname"],
+        "port": info["port"],
+        "login": info["userid"],
+        "password": info["password"],
+        "virtualhost": info["virtual_host"],
+    }
+
+
+async def main() -> None:
+    connection = await aio_pika.connect_robust(**get_broker_connection_params())
+    try:
+        channel = await connection.channel()
+        # prefetch ограничивает число одновременно обрабатываемых задач
+        await channel.set_qos(prefetch_count=email_settings.async_worker_concurrency)
+        queue = await channel.declare_queue(email_settings.async_worker_queue, durable=True)
+        for ttl, delay_queue in get_delay_queues().items():
+            await channel.declare_queue(
+                delay_queue,
+                durable=True,
+                arguments={
+                    "x-message-ttl": ttl,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": email_settings.async_worker_queue,
+                },
+            )
+        await channel.declare_queue(email_settings.async_worker_dead_letter_queue, durable=True)
+        consumer = TaskConsumer(exchange=channel.default_exchange)
+        await queue.consume(consumer.handle_message)
+        logger.info(
+            f"Асинхронный воркер слушает очередь {email_settings.async_worker_queue!r}, "
+            f"конкурентность {email_settings.async_worker_concurrency}"
+        )
+        await asyncio.Future()
+    finally:
+        await smtp_connection_pool.close()
+        await close_redis_connection_pool()
+        await connection.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, TypeVar
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.config import cache_settings
+from src.container import logger
+from src.schemas import UserSchema
+from src.metrics import metrics_registry
+from src.redis_pool import get_redis_client
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+# Локальный LRU кэш процесса со временем жизни записей, безопасен для вызова из пула потоков
+class LRUCache(Generic[K, V]):
+    def __init__(self, max_size: int, ttl: float | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int | float]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Двухуровневый кэш пользователей по uid: локальный LRU процесса и общий redis
+class UserCache:
+    def __init__(self, local_max_size: int, local_ttl: float, redis_ttl: int, redis_prefix: str) -> None:
+        self.local: LRUCache[int, UserSchema] = LRUCache(max_size=local_max_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.redis_prefix = redis_prefix
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+
+    def _redis_key(self, uid: int) -> str:
+        return f"{self.redis_prefix}:{uid}"
+
+    @staticmethod
+    def _redis() -> Redis:
+        return get_redis_client()
+
+    async def get(self, uid: int) -> UserSchema | None:
+        user = self.local.get(uid)
+        if user is not None:
+            return user
+        # Ошибки redis не должны ломать авторизацию, пользователь будет получен из базы данных
+        try:
+            cached: str | None = await self._redis().get(self._redis_key(uid))
+        except RedisError as e:
+            self.redis_errors += 1
+            logger.warning(f"Не удалось прочитать пользователя {uid} из redis кэша: {e}")
+            return None
+        if cached is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        user = UserSchema.model_validate_json(cached)
+        self.local.set(uid, user)
+        return user
+
+    async def set(self, user: UserSchema) -> None:
+        self.local.set(user.id, user)
+        try:
+            await self._redis().set(self._redis_key(user.id), user.model_dump_json(), ex=self.redis_ttl)
+        except RedisError as e:
+            self.redis_errors += 1
+            logger.warning(f"Не удалось записать пользователя {user.id} в redis кэш: {e}")
+
+    async def invalidate(self, uid: int) -> None:
+        self.local.delete(uid)
+        try:
+            await self._redis().delete(self._redis_key(uid))
+        except RedisError as e:
+            self.redis_errors += 1
+            logger.warning(f"Не удалось удалить пользователя {uid} из redis кэша: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+            },
+        }
+
+
+user_cache = UserCache(
+    local_max_size=cache_settings.USER_CACHE_LOCAL_MAX_SIZE,
+    local_ttl=cache_settings.USER_CACHE_LOCAL_TTL,
+    redis_ttl=cache_settings.USER_CACHE_REDIS_TTL,
+    redis_prefix=cache_settings.USER_CACHE_REDIS_PREFIX,
+)
+
+
+def collect_user_cache_stats() -> list[tuple[dict[str, str], float]]:
+    samples = [({"tier": "local", "stat": stat}, value) for stat, value in user_cache.local.stats().items()]
+    samples += [
+        ({"tier": "redis", "stat": stat}, value)
+        for stat, value in user_cache.stats()["redis"].items()
+    ]
+    return samples
+
+
+metrics_registry.gauge_collector("user_cache", "Статистика кэша пользователей", collect_user_cache_stats)
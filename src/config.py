@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from src.container import BASE_DIR
 
@@ -5,11 +8,25 @@ from src.container import BASE_DIR
 class WebSettings(BaseSettings):
     WEBAPP_HOST: str
     WEBAPP_PORT: int
+    # Настройки запуска через python -m src.server, 0 воркеров - по числу ядер
+    WEBAPP_WORKERS: int = 0
+    # Воркер пересоздается после WEBAPP_MAX_REQUESTS + случайное число до WEBAPP_MAX_REQUESTS_JITTER запросов, 0 - без ограничения
+    WEBAPP_MAX_REQUESTS: int = 0
+    WEBAPP_MAX_REQUESTS_JITTER: int = 0
+    # inherit - один сокет родителя на всех воркеров, reuseport - свой сокет у каждого воркера с SO_REUSEPORT
+    WEBAPP_SOCKET_MODE: Literal["inherit", "reuseport"] = "inherit"
+    WEBAPP_BACKLOG: int = 2048
+    WEBAPP_GRACEFUL_TIMEOUT: int = 30
+    WEBAPP_WORKER_READY_TIMEOUT: float = 60.0
+    # auto выбирает uvloop и httptools, если они установлены
+    WEBAPP_LOOP: Literal["auto", "uvloop", "asyncio"] = "auto"
+    WEBAPP_HTTP: Literal["auto", "httptools", "h11"] = "auto"
 
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / 'env_files/.env',
         env_file_encoding="utf-8",
         case_sensitive=True,
+        extra='ignore'
     )
 
 
@@ -19,6 +36,25 @@ class DatabaseSettings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: int
     POSTGRES_DB: str
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 20
+    POSTGRES_POOL_TIMEOUT: float = 30.0
+    POSTGRES_POOL_RECYCLE: int = 1800
+    POSTGRES_POOL_PRE_PING: bool = True
+    POSTGRES_CONNECT_TIMEOUT: float = 10.0
+    POSTGRES_COMMAND_TIMEOUT: float = 30.0
+    # Размер кэша скомпилированных запросов SQLAlchemy и кэша подготовленных запросов asyncpg на соединение
+    POSTGRES_QUERY_CACHE_SIZE: int = 500
+    POSTGRES_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # create_all создает таблицы при каждом запуске, check_revision только сверяет ревизию alembic
+    POSTGRES_STARTUP_SCHEMA: Literal["create_all", "check_revision"] = "create_all"
+    POSTGRES_WARMUP_CONNECTIONS: int = 5
+    # Реплики для чтения в виде json списка DSN postgresql+asyncpg://...
+    POSTGRES_REPLICA_URLS: list[str] = []
+    POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
+    POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT: float = 2.0
+    # Сколько секунд после записи чтения пользователя идут в основную базу (больше задержки репликации)
+    POSTGRES_REPLICA_PRIMARY_PIN_SECONDS: int = 10
 
     @property
     def POSTGRES_URL_psycopg(self):
@@ -50,14 +86,109 @@ class TasksSettings(BaseSettings):
     REDIS_PORT: int
     RABBITMQ_HOST: str
     RABBITMQ_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    REDIS_WARMUP_CONNECTIONS: int = 5
+
+    @property
+    def REDIS_URL(self):
+        return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}"
 
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / 'env_files/.env.tasks',
         env_file_encoding='utf-8',
-        case_sensitive=True
+        case_sensitive=True,
+        extra='ignore'
+    )
+
+
+class CacheSettings(BaseSettings):
+    USER_CACHE_LOCAL_MAX_SIZE: int = 10_000
+    USER_CACHE_LOCAL_TTL: float = 5.0
+    USER_CACHE_REDIS_TTL: int = 300
+    USER_CACHE_REDIS_PREFIX: str = "user"
+
+    model_config = SettingsConfigDict(
+        env_file=BASE_DIR / 'env_files/.env.tasks',
+        env_file_encoding='utf-8',
+        case_sensitive=True,
+        extra='ignore'
+    )
+
+
+class RateLimitRule(BaseModel):
+    method: str
+    # Путь в формате маршрутов FastAPI, например /v1/auth/reset-password/{key}
+    path: str
+    key: Literal["ip", "email", "uid"]
+    # Не больше limit запросов за period секунд с пополнением по одному токену
+    limit: int
+    period: float
+
+
+class RateLimitSettings(BaseSettings):
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_PREFIX: str = "ratelimit"
+    # Брать ip клиента из X-Forwarded-For (только за доверенным прокси)
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+    # При недоступном redis запросы пропускаются, а не отклоняются
+    RATE_LIMIT_FAIL_OPEN: bool = True
+    RATE_LIMIT_RULES: list[RateLimitRule] = [
+        RateLimitRule(method="POST", path="/v1/email/verification-code", key="ip", limit=20, period=60),
+        RateLimitRule(method="POST", path="/v1/email/verification-code", key="email", limit=3, period=60),
+        RateLimitRule(method="POST", path="/v1/email/reset-password", key="ip", limit=20, period=60),
+        RateLimitRule(method="POST", path="/v1/email/reset-password", key="email", limit=3, period=60),
+        RateLimitRule(method="POST", path="/v1/auth/signup", key="ip", limit=10, period=60),
+        RateLimitRule(method="POST", path="/v1/auth/signup", key="email", limit=5, period=300),
+        RateLimitRule(method="POST", path="/v1/auth/login", key="ip", limit=30, period=60),
+        RateLimitRule(method="POST", path="/v1/auth/login", key="email", limit=10, period=300),
+        RateLimitRule(method="POST", path="/v1/auth/reset-password/{key}", key="ip", limit=10, period=60),
+        RateLimitRule(method="POST", path="/v1/auth/reset-password/{key}", key="email", limit=5, period=300),
+        RateLimitRule(method="POST", path="/v1/jwt/refresh", key="ip", limit=60, period=60),
+        RateLimitRule(method="POST", path="/v1/jwt/refresh", key="uid", limit=30, period=60),
+    ]
+
+    model_config = SettingsConfigDict(
+        env_file=BASE_DIR / 'env_files/.env',
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+        extra='ignore'
+    )
+
+
+class LoadSheddingSettings(BaseSettings):
+    LOAD_SHEDDING_ENABLED: bool = True
+    # Пороги для маршрутов с низким приоритетом, обычные отклоняются при x2, высокие при x4
+    LOAD_SHEDDING_MAX_LAG_MS: float = 100.0
+    # Порог для высокого приоритета, низкий отклоняется при 50%, обычный при 75%
+    LOAD_SHEDDING_MAX_IN_FLIGHT: int = 1000
+    LOAD_SHEDDING_PROBE_INTERVAL: float = 0.05
+    LOAD_SHEDDING_RETRY_AFTER_SECONDS: int = 1
+    # Префиксы путей: низкий приоритет отклоняется первым, высокий последним, остальные обычные
+    LOAD_SHEDDING_LOW_PRIORITY_PATHS: list[str] = ["/v1/email/"]
+    LOAD_SHEDDING_HIGH_PRIORITY_PATHS: list[str] = [
+        "/v1/auth/protected",
+        "/v1/admin/protected",
+        "/v1/stuff/protected",
+        "/v1/jwt/refresh",
+    ]
+    # Служебные пути никогда не отклоняются
+    LOAD_SHEDDING_EXEMPT_PATHS: list[str] = ["/ready", "/metrics"]
+
+    model_config = SettingsConfigDict(
+        env_file=BASE_DIR / 'env_files/.env',
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+        extra='ignore'
     )
 
 
 web_settings = WebSettings()
 database_settings = DatabaseSettings()
 tasks_settings = TasksSettings()
+cache_settings = CacheSettings()
+rate_limit_settings = RateLimitSettings()
+load_shedding_settings = LoadSheddingSettings()
@@ -1,12 +1,18 @@
-from typing import Annotated, AsyncGenerator
+from typing import Annotated, Any, AsyncGenerator
 
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, mapped_column
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from sqlalchemy.util import LRUCache
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 from sqlalchemy import text, String
 import datetime
+import time
 
 from src.config import database_settings
+from src.metrics import db_compiled_cache_total, db_pool_wait_seconds, instrument_engine, metrics_registry
 
 
 
@@ -32,9 +38,146 @@ class Base(DeclarativeBase):
 
         return f"{self.__class__.__name__}({', '.join(columns)})"
 
-engine = create_async_engine(
-    url=database_settings.POSTGRES_URL_asyncpg,
-    echo=False
+class PoolWaitStats:
+    def __init__(self) -> None:
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_seconds": self.total_wait_seconds / self.acquired if self.acquired else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+# Очередь свободных соединений, замеряющая только ожидание соединения, которое вернет другой запрос.
+# Время открытия нового соединения (overflow) сюда не входит.
+class TimedAsyncAdaptedQueue(AsyncAdaptedQueue[ConnectionPoolEntry]):
+    def __init__(self, maxsize: int = 0, use_lifo: bool = False) -> None:
+        super().__init__(maxsize=maxsize, use_lifo=use_lifo)
+        self.wait_stats = PoolWaitStats()
+
+    def get(self, block: bool = True, timeout: float | None = None) -> ConnectionPoolEntry:
+        if not block:
+            return super().get(block=False)
+        self.wait_stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super().get(block=True, timeout=timeout)
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_stats.waiting -= 1
+            self.wait_stats.total_wait_seconds += waited
+            self.wait_stats.max_wait_seconds = max(self.wait_stats.max_wait_seconds, waited)
+            db_pool_wait_seconds.observe((), waited)
+
+
+# Пул соединений со своей статистикой ожидания: у основной базы и у каждой реплики она отдельная
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    _queue_class = TimedAsyncAdaptedQueue
+
+    @property
+    def wait_stats(self) -> PoolWaitStats:
+        return self._pool.wait_stats
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        self.wait_stats.acquired += 1
+        return connection
+
+
+# Кэши скомпилированных запросов по имени движка. Кэш передается движку явно через execution_options,
+# чтобы его размер можно было узнать без обращения к внутренним атрибутам SQLAlchemy
+compiled_caches: dict[str, LRUCache] = {}
+
+
+def create_compiled_cache(name: str) -> LRUCache:
+    compiled_cache = LRUCache(database_settings.POSTGRES_QUERY_CACHE_SIZE)
+    compiled_caches[name] = compiled_cache
+    return compiled_cache
+
+
+def create_engine(url: str, name: str = "primary") -> AsyncEngine:
+    new_engine = create_async_engine(
+        url=url,
+        echo=False,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=database_settings.POSTGRES_POOL_SIZE,
+        max_overflow=database_settings.POSTGRES_MAX_OVERFLOW,
+        pool_timeout=database_settings.POSTGRES_POOL_TIMEOUT,
+        pool_recycle=database_settings.POSTGRES_POOL_RECYCLE,
+        pool_pre_ping=database_settings.POSTGRES_POOL_PRE_PING,
+        execution_options={"compiled_cache": create_compiled_cache(name)},
+        connect_args={
+            "timeout": database_settings.POSTGRES_CONNECT_TIMEOUT,
+            "command_timeout": database_settings.POSTGRES_COMMAND_TIMEOUT,
+            "prepared_statement_cache_size": database_settings.POSTGRES_PREPARED_STATEMENT_CACHE_SIZE,
+        },
+    )
+    instrument_engine(new_engine.sync_engine, name=name)
+    return new_engine
+
+
+engine = create_engine(url=database_settings.POSTGRES_URL_asyncpg)
+
+
+def get_pool_stats(pool_engine: AsyncEngine = engine) -> dict[str, Any]:
+    pool = pool_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": database_settings.POSTGRES_MAX_OVERFLOW,
+        "wait": pool.wait_stats.as_dict(),
+    }
+
+
+def collect_pool_stats() -> list[tuple[dict[str, str], float]]:
+    stats = get_pool_stats()
+    wait = stats.pop("wait")
+    return [({"stat": stat}, value) for stat, value in (*stats.items(), *wait.items())]
+
+
+metrics_registry.gauge_collector("db_pool", "Состояние пула соединений с базой данных", collect_pool_stats)
+
+
+def get_compiled_cache_stats() -> dict[str, dict[str, int | float]]:
+    counts: dict[tuple[str, str], float] = {}
+    for (name, _, result), value in db_compiled_cache_total.values().items():
+        counts[(name, result)] = counts.get((name, result), 0) + value
+    stats: dict[str, dict[str, int | float]] = {}
+    for name, compiled_cache in compiled_caches.items():
+        hits = int(counts.get((name, "cache_hit"), 0))
+        misses = int(counts.get((name, "cache_miss"), 0))
+        stats[name] = {
+            "size": len(compiled_cache),
+            "max_size": compiled_cache.capacity,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
+    return stats
+
+
+metrics_registry.gauge_collector(
+    "db_compiled_cache",
+    "Состояние кэша скомпилированных SQL запросов",
+    lambda: [
+        ({"engine": name, "stat": stat}, value)
+        for name, engine_stats in get_compiled_cache_stats().items()
+        for stat, value in engine_stats.items()
+    ],
 )
 
 
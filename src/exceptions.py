@@ -1,6 +1,8 @@
 from fastapi import HTTPException
 from starlette import status
 
+from src.config import load_shedding_settings
+
 invalid_password_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="Неверный пароль!"
@@ -21,6 +23,10 @@ too_many_requests_exception = HTTPException(
     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
     detail="Слишком частые запросы. Попробуйте позже!"
 )
+code_attempts_exceeded_exception = HTTPException(
+    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+    detail="Превышено число попыток ввода кода. Запросите новый код!"
+)
 invalid_email_exception = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST,
     detail=f"Такой почты не существует!",
@@ -36,4 +42,9 @@ user_is_not_admin_exception = HTTPException(
 user_is_not_stuff_exception = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
     detail="Пользователь не является работником сервиса!"
-)
\ No newline at end of file
+)
+service_overloaded_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Сервер перегружен. Попробуйте позже!",
+    headers={"Retry-After": str(load_shedding_settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS)},
+)
@@ -0,0 +1,135 @@
+import asyncio
+import enum
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import load_shedding_settings
+from src.exceptions import service_overloaded_exception
+from src.metrics import load_shedding_rejections_total, metrics_registry
+
+# Сброс нагрузки: при задержке event loop или слишком большом числе одновременных запросов
+# новые запросы сразу получают 503, начиная с маршрутов низкого приоритета.
+
+
+class Priority(enum.IntEnum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+# Множители порогов по приоритетам: задержка event loop и доля от максимума одновременных запросов
+LAG_FACTORS = {Priority.LOW: 1.0, Priority.NORMAL: 2.0, Priority.HIGH: 4.0}
+IN_FLIGHT_FACTORS = {Priority.LOW: 0.5, Priority.NORMAL: 0.75, Priority.HIGH: 1.0}
+
+
+# Фоновая задача, которая просыпается каждые interval секунд и считает, насколько она опоздала
+class EventLoopLagMonitor:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.next_tick = 0.0
+        self._task: asyncio.Task | None = None
+
+    # Запускается и останавливается в lifespan приложения
+    def start(self) -> None:
+        if self._task is None:
+            self.next_tick = time.monotonic() + self.interval
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(0.0, now - self.next_tick)
+            self.max_lag = max(self.max_lag, self.lag)
+            self.next_tick = now + self.interval
+
+    def current_lag(self) -> float:
+        if self._task is None:
+            return 0.0
+        # Пока loop заблокирован, задача не может проснуться, поэтому учитывается и текущее опоздание
+        return max(self.lag, time.monotonic() - self.next_tick)
+
+
+class LoadShedder:
+    def __init__(self, max_lag_ms: float, max_in_flight: int, probe_interval: float) -> None:
+        self.monitor = EventLoopLagMonitor(interval=probe_interval)
+        self.max_lag = max_lag_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    def get_overload_reason(self, priority: Priority) -> str | None:
+        if self.in_flight >= self.max_in_flight * IN_FLIGHT_FACTORS[priority]:
+            return "in_flight"
+        if self.monitor.current_lag() >= self.max_lag * LAG_FACTORS[priority]:
+            return "lag"
+        return None
+
+    def collect(self) -> list[tuple[dict[str, str], float]]:
+        return [
+            ({"stat": "event_loop_lag_seconds"}, self.monitor.lag),
+            ({"stat": "event_loop_max_lag_seconds"}, self.monitor.max_lag),
+            ({"stat": "in_flight"}, self.in_flight),
+        ]
+
+
+load_shedder = LoadShedder(
+    max_lag_ms=load_shedding_settings.LOAD_SHEDDING_MAX_LAG_MS,
+    max_in_flight=load_shedding_settings.LOAD_SHEDDING_MAX_IN_FLIGHT,
+    probe_interval=load_shedding_settings.LOAD_SHEDDING_PROBE_INTERVAL,
+)
+metrics_registry.gauge_collector("load_shedding", "Задержка event loop и число запросов в обработке", load_shedder.collect)
+
+
+def get_priority(path: str) -> Priority | None:
+    if any(path.startswith(prefix) for prefix in load_shedding_settings.LOAD_SHEDDING_EXEMPT_PATHS):
+        return None
+    if any(path.startswith(prefix) for prefix in load_shedding_settings.LOAD_SHEDDING_HIGH_PRIORITY_PATHS):
+        return Priority.HIGH
+    if any(path.startswith(prefix) for prefix in load_shedding_settings.LOAD_SHEDDING_LOW_PRIORITY_PATHS):
+        return Priority.LOW
+    return Priority.NORMAL
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app: ASGIApp, shedder: LoadShedder = load_shedder) -> None:
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not load_shedding_settings.LOAD_SHEDDING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        priority = get_priority(scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = self.shedder.get_overload_reason(priority)
+        if reason is not None:
+            load_shedding_rejections_total.inc((priority.name.lower(), reason))
+            response = JSONResponse(
+                content={"detail": service_overloaded_exception.detail},
+                status_code=service_overloaded_exception.status_code,
+                headers=service_overloaded_exception.headers,
+            )
+            await response(scope, receive, send)
+            return
+
+        self.shedder.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.in_flight -= 1
@@ -9,9 +9,17 @@ from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 from fastapi import FastAPI
 import uvicorn
-from v1 import router as v1_router
-from src.database import create_db_and_tables
+from v1 import router as v1_router, jwks_router
+from src.replicas import replica_router
+from src.redis_pool import create_redis_connection_pool, close_redis_connection_pool
+from src.v1.jwt.executor import crypto_executor
 from src.config import web_settings
+from src.metrics import MetricsMiddleware, router as metrics_router
+from src.rate_limit import RateLimitMiddleware
+from src.load_shedding import LoadSheddingMiddleware, load_shedder
+from src.startup import readiness, warm_up, router as readiness_router
+from src.responses import FastJSONResponse
+from src.v1.jwt.revocation import token_revocation_list
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -20,18 +28,39 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    await create_db_and_tables()
+    create_redis_connection_pool()
+    # Список отозванных токенов загружается до того, как /ready начнет отвечать 200
+    await token_revocation_list.start()
+    await warm_up()
+    replica_router.start()
+    load_shedder.monitor.start()
 
     yield
 
+    readiness.set_not_ready()
+    await load_shedder.monitor.stop()
+    await token_revocation_list.stop()
+    await replica_router.stop()
+    await close_redis_connection_pool()
+    crypto_executor.shutdown()
 
-app = FastAPI(lifespan=lifespan)
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.include_router(router=v1_router)
+app.include_router(router=jwks_router)
+app.include_router(router=metrics_router)
+app.include_router(router=readiness_router)
 
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_headers=["*"], allow_methods=["*"],allow_credentials=True)
 app.add_middleware(HTTPSRedirectMiddleware)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
+# Ограничение частоты стоит перед обработчиками, чтобы отклоненные запросы не доходили до базы данных и bcrypt
+app.add_middleware(RateLimitMiddleware)
+# Сброс нагрузки отклоняет запросы раньше всех остальных проверок
+app.add_middleware(LoadSheddingMiddleware)
+# Добавляется последним, чтобы быть внешним и учитывать время всех остальных middleware
+app.add_middleware(MetricsMiddleware)
 
 
 if __name__ == '__main__':
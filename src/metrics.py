@@ -0,0 +1,235 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable
+
+from fastapi import APIRouter
+from sqlalchemy import Engine, event
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Легковесные метрики в формате Prometheus без внешних зависимостей.
+# Значения хранятся по кортежам меток, текст формируется только при запросе /metrics.
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Sample = tuple[dict[str, str], float]
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def values(self) -> dict[tuple[str, ...], float]:
+        return dict(self._values)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Для каждого набора меток: счетчики по корзинам (последняя +Inf), сумма и количество
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = [0.0] * (len(self.buckets) + 3)
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, values in list(self._values.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), values):
+                cumulative += count
+                bucket_labels = format_labels(self.labelnames, labels, f'le="{format_value(bound)}"')
+                yield f"{self.name}_bucket{bucket_labels} {format_value(cumulative)}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(values[-2])}"
+            yield f"{self.name}_count{format_labels(self.labelnames, labels)} {format_value(values[-1])}"
+
+
+# Сборщик значений, которые уже считаются в других местах (пулы, кэши) и читаются в момент запроса
+class GaugeCollector:
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.collect():
+            label_names = tuple(labels)
+            yield f"{self.name}{format_labels(label_names, tuple(labels.values()))} {format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram | GaugeCollector] = []
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name=name, documentation=documentation, labelnames=labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name=name, documentation=documentation, labelnames=labelnames, buckets=buckets))
+
+    def gauge_collector(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> GaugeCollector:
+        return self.register(GaugeCollector(name=name, documentation=documentation, collect=collect))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+http_request_duration_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds", "Время обработки HTTP запроса", ("method", "route")
+)
+http_requests_total = metrics_registry.counter(
+    "http_requests_total", "Количество HTTP запросов по статусам", ("method", "route", "status")
+)
+db_query_duration_seconds = metrics_registry.histogram(
+    "db_query_duration_seconds", "Время выполнения SQL запроса", ("statement",)
+)
+redis_command_duration_seconds = metrics_registry.histogram(
+    "redis_command_duration_seconds", "Время выполнения команды redis", ("command",)
+)
+rate_limit_rejections_total = metrics_registry.counter(
+    "rate_limit_rejections_total", "Количество запросов, отклоненных ограничением частоты", ("method", "route")
+)
+load_shedding_rejections_total = metrics_registry.counter(
+    "load_shedding_rejections_total", "Количество запросов, отклоненных из-за перегрузки", ("priority", "reason")
+)
+db_compiled_cache_total = metrics_registry.counter(
+    "db_compiled_cache_total", "Обращения к кэшу скомпилированных SQL запросов", ("engine", "statement", "result")
+)
+db_pool_wait_seconds = metrics_registry.histogram(
+    "db_pool_wait_seconds", "Время ожидания соединения из пула базы данных"
+)
+crypto_duration_seconds = metrics_registry.histogram(
+    "crypto_duration_seconds", "Время выполнения bcrypt и подписи JWT в пуле потоков", ("function",)
+)
+
+
+def get_route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        # Путь без найденного маршрута не используется как метка, чтобы не раздувать число рядов
+        return "unmatched"
+    return getattr(route, "path_format", None) or getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = get_route_label(scope)
+            method = scope["method"]
+            http_request_duration_seconds.observe((method, route), time.perf_counter() - started)
+            http_requests_total.inc((method, route, str(status_code)))
+
+
+def instrument_engine(sync_engine: Engine, name: str) -> None:
+    # name различает основную базу и реплики в метриках
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["query_started_at"].pop()
+        statement_type = statement.lstrip().split(" ", 1)[0].upper() or "OTHER"
+        db_query_duration_seconds.observe((statement_type,), time.perf_counter() - started)
+        # cache_miss у часто выполняемых запросов означает, что SQLAlchemy компилирует их заново
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit is not None:
+            db_compiled_cache_total.inc((name, statement_type, cache_hit.name.lower()))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context) -> None:
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started_at"):
+            connection.info["query_started_at"].pop()
+
+
+router = APIRouter(tags=["METRICS"])
+
+
+@router.get('/metrics', include_in_schema=False)
+async def metrics() -> Response:
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
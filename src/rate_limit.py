@@ -0,0 +1,201 @@
+import json
+import math
+import re
+from typing import Any
+
+from fastapi import HTTPException
+from jwt.exceptions import InvalidTokenError
+from redis.exceptions import RedisError
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import RateLimitRule, rate_limit_settings
+from src.container import logger
+from src.exceptions import too_many_requests_exception
+from src.metrics import rate_limit_rejections_total
+from src.redis_pool import get_redis_client
+from src.v1.jwt.config import cookies_settings, jwt_settings
+from src.v1.jwt.utils import decode_jwt_async
+
+# Ограничение частоты запросов до обработчиков: отклоненный запрос не доходит до базы данных и bcrypt.
+# Все корзины запроса проверяются и списываются одним lua скриптом, то есть одним обращением к redis.
+
+# Token bucket: ARGV содержит пары (limit, period в мс) для каждого ключа из KEYS.
+# Токены списываются только если их хватает во всех корзинах, иначе возвращается время ожидания в мс.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local retry_after = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2 - 1])
+    local interval = tonumber(ARGV[i * 2]) / limit
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(state[1]) or limit
+    local ts = tonumber(state[2]) or now
+    available = math.min(limit, available + (now - ts) / interval)
+    if available < 1 then
+        retry_after = math.max(retry_after, math.ceil((1 - available) * interval))
+    end
+    tokens[i] = available
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', key, ARGV[i * 2])
+end
+return 0
+"""
+
+# Тело запроса читается для ключа email только если оно небольшое
+MAX_BODY_SIZE = 64 * 1024
+
+
+class RouteLimits:
+    def __init__(self, method: str, path: str, rules: list[RateLimitRule]) -> None:
+        self.method = method.upper()
+        self.path = path
+        self.path_regex: re.Pattern[str] = compile_path(path)[0]
+        self.rules = rules
+        self.needs_body = any(rule.key == "email" for rule in rules)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rules: list[RateLimitRule] | None = None) -> None:
+        self.app = app
+        grouped: dict[tuple[str, str], list[RateLimitRule]] = {}
+        for rule in rate_limit_settings.RATE_LIMIT_RULES if rules is None else rules:
+            grouped.setdefault((rule.method.upper(), rule.path), []).append(rule)
+        self.routes = [RouteLimits(method=method, path=path, rules=rules) for (method, path), rules in grouped.items()]
+        # Клиент передается при каждом вызове, так как пул redis пересоздается в lifespan
+        self.script = get_redis_client().register_script(TOKEN_BUCKET_SCRIPT)
+
+    def match(self, scope: Scope) -> RouteLimits | None:
+        for route in self.routes:
+            if route.method == scope["method"] and route.path_regex.match(scope["path"]):
+                return route
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not rate_limit_settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        route = self.match(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        body: bytes | None = None
+        if route.needs_body:
+            body, more_body = await read_body(receive)
+            receive = replay_body(body=body, more_body=more_body, receive=receive)
+            if more_body:
+                body = None
+
+        retry_after_ms = await self.check(route=route, request=Request(scope), body=body)
+        if retry_after_ms:
+            response = JSONResponse(
+                content={"detail": too_many_requests_exception.detail},
+                status_code=too_many_requests_exception.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after_ms / 1000)))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def check(self, route: RouteLimits, request: Request, body: bytes | None) -> int:
+        keys: list[str] = []
+        args: list[int] = []
+        for rule in route.rules:
+            value = await get_key_value(rule=rule, request=request, body=body)
+            if value is None:
+                continue
+            keys.append(f"{rate_limit_settings.RATE_LIMIT_REDIS_PREFIX}:{route.method}:{route.path}:{rule.key}:{value}")
+            args += [rule.limit, math.ceil(rule.period * 1000)]
+        if not keys:
+            return 0
+        try:
+            retry_after_ms = int(await self.script(keys=keys, args=args, client=get_redis_client()))
+        except RedisError as e:
+            logger.warning(f"Не удалось проверить ограничение частоты запросов для {route.path}: {e!r}")
+            return 0 if rate_limit_settings.RATE_LIMIT_FAIL_OPEN else 1000
+        if retry_after_ms:
+            rate_limit_rejections_total.inc((route.method, route.path))
+        return retry_after_ms
+
+
+async def get_key_value(rule: RateLimitRule, request: Request, body: bytes | None) -> str | None:
+    if rule.key == "ip":
+        return get_client_ip(request)
+    if rule.key == "email":
+        return get_body_email(body)
+    return await get_token_uid(request)
+
+
+def get_client_ip(request: Request) -> str | None:
+    if rate_limit_settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def get_body_email(body: bytes | None) -> str | None:
+    if not body:
+        return None
+    try:
+        data: Any = json.loads(body)
+    except ValueError:
+        return None
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email else None
+
+
+async def get_token_uid(request: Request) -> str | None:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        token = authorization.split(jwt_settings.access_token_type)[-1].strip()
+    else:
+        token = request.cookies.get(cookies_settings.refresh_token_name)
+    if not token:
+        return None
+    # Ключом служит только uid из проверенного токена, иначе лимит обходится подделкой uid.
+    # Проверка подписи выполняется в пуле потоков, а не в event loop
+    try:
+        return str((await decode_jwt_async(token=token))["uid"])
+    except (InvalidTokenError, KeyError):
+        return None
+    except HTTPException:
+        # Пул перегружен: остаются остальные ключи, например ip
+        return None
+
+
+async def read_body(receive: Receive) -> tuple[bytes, bool]:
+    # Читается не больше MAX_BODY_SIZE, остаток тела обработчик дочитает сам
+    chunks: list[bytes] = []
+    size = 0
+    more_body = True
+    while more_body and size <= MAX_BODY_SIZE:
+        message = await receive()
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        more_body = message.get("more_body", False)
+    return b"".join(chunks), more_body
+
+
+def replay_body(body: bytes, more_body: bool, receive: Receive) -> Receive:
+    is_replayed = False
+
+    async def replay_receive() -> Message:
+        nonlocal is_replayed
+        if not is_replayed:
+            is_replayed = True
+            return {"type": "http.request", "body": body, "more_body": more_body}
+        return await receive()
+
+    return replay_receive
@@ -0,0 +1,47 @@
+import time
+from typing import Any
+
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from src.config import tasks_settings
+from src.metrics import redis_command_duration_seconds
+
+
+# Общий на процесс пул соединений с redis, создается в lifespan приложения
+redis_connection_pool: BlockingConnectionPool | None = None
+
+
+def create_redis_connection_pool() -> BlockingConnectionPool:
+    global redis_connection_pool
+    if redis_connection_pool is None:
+        redis_connection_pool = BlockingConnectionPool.from_url(
+            tasks_settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=tasks_settings.REDIS_MAX_CONNECTIONS,
+            timeout=tasks_settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=tasks_settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_timeout=tasks_settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=tasks_settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        )
+    return redis_connection_pool
+
+
+async def close_redis_connection_pool() -> None:
+    global redis_connection_pool
+    if redis_connection_pool is not None:
+        await redis_connection_pool.aclose()
+        redis_connection_pool = None
+
+
+# Клиент redis, замеряющий время выполнения каждой команды
+class InstrumentedRedis(Redis):
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            redis_command_duration_seconds.observe((str(args[0]).upper(),), time.perf_counter() - started)
+
+
+def get_redis_client() -> InstrumentedRedis:
+    return InstrumentedRedis(connection_pool=create_redis_connection_pool())
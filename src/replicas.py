@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, AsyncGenerator, AsyncIterator
+
+from fastapi import Depends
+from redis.exceptions import RedisError
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.config import database_settings
+from src.container import logger
+from src.database import async_session_factory, create_engine, get_pool_stats
+from src.redis_pool import get_redis_client
+
+# Чтение пользователей распределяется по репликам по кругу. Реплика, не ответившая на проверку
+# или упавшая на запросе, исключается из ротации до следующей успешной проверки.
+# После записи пользователь на короткое время закрепляется за основной базой (read-your-writes).
+
+
+class Replica:
+    def __init__(self, url: str) -> None:
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(url=url, name=self.url)
+        self.is_healthy = True
+        self.failures = 0
+        self.checked_at = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, urls: list[str], health_check_interval: float, health_check_timeout: float, pin_seconds: int) -> None:
+        self.replicas = [Replica(url=url) for url in urls]
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.pin_seconds = pin_seconds
+        self._counter = itertools.count()
+        self._health_check_task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def next_engine(self) -> AsyncEngine | None:
+        healthy = [replica for replica in self.replicas if replica.is_healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)].engine
+
+    def mark_unhealthy(self, engine: AsyncEngine | None) -> None:
+        for replica in self.replicas:
+            if replica.engine is engine and replica.is_healthy:
+                replica.is_healthy = False
+                replica.failures += 1
+                logger.warning(f"Реплика {replica.url} исключена из ротации")
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                await asyncio.wait_for(connection.execute(text("SELECT 1")), timeout=self.health_check_timeout)
+        except Exception as e:
+            if replica.is_healthy:
+                replica.failures += 1
+                logger.warning(f"Реплика {replica.url} не прошла проверку: {e!r}")
+            replica.is_healthy = False
+        else:
+            if not replica.is_healthy:
+                logger.info(f"Реплика {replica.url} возвращена в ротацию")
+            replica.is_healthy = True
+        replica.checked_at = time.time()
+
+    async def run_health_checks(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.health_check_interval)
+
+    def start(self) -> None:
+        if self.enabled and self._health_check_task is None:
+            self._health_check_task = asyncio.create_task(self.run_health_checks())
+
+    async def stop(self) -> None:
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            try:
+                await self._health_check_task
+            except asyncio.CancelledError:
+                pass
+            self._health_check_task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        engine = self.next_engine()
+        if engine is None:
+            # Без реплик (или если все недоступны) чтение идет в основную базу
+            async with async_session_factory() as async_session:
+                yield async_session
+            return
+        async with async_session_factory(bind=engine, info={"read_only": True}) as async_session:
+            yield async_session
+
+    @staticmethod
+    def pin_keys(**filters: Any) -> list[str]:
+        return [f"db:primary-pin:{field}:{value}" for field, value in filters.items() if field in ("id", "email")]
+
+    async def pin_user(self, user_id: int, email: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            async with get_redis_client().pipeline(transaction=False) as pipe:
+                for key in self.pin_keys(id=user_id, email=email):
+                    pipe.set(key, 1, ex=self.pin_seconds)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Не удалось закрепить пользователя {user_id} за основной базой: {e!r}")
+
+    async def is_pinned(self, **filters: Any) -> bool:
+        keys = self.pin_keys(**filters)
+        if not keys:
+            return False
+        try:
+            return bool(await get_redis_client().exists(*keys))
+        except RedisError:
+            # Без redis нельзя проверить недавнюю запись, поэтому безопаснее читать из основной базы
+            return True
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "url": replica.url,
+                "healthy": replica.is_healthy,
+                "failures": replica.failures,
+                "checked_at": replica.checked_at,
+                "pool": get_pool_stats(replica.engine),
+            }
+            for replica in self.replicas
+        ]
+
+
+replica_router = ReplicaRouter(
+    urls=database_settings.POSTGRES_REPLICA_URLS,
+    health_check_interval=database_settings.POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL,
+    health_check_timeout=database_settings.POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT,
+    pin_seconds=database_settings.POSTGRES_REPLICA_PRIMARY_PIN_SECONDS,
+)
+
+
+async def get_read_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with replica_router.session() as async_session:
+        yield async_session
+
+
+ReadAsyncSessionDep = Annotated[AsyncSession, Depends(get_read_async_session)]
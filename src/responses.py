@@ -0,0 +1,32 @@
+from typing import Any
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+from src.schemas import UserSchema
+
+# Быстрый путь JSON ответов: кодирование выполняет pydantic_core вместо json.dumps,
+# неизменные тела ответов кодируются один раз при импорте.
+
+# Сериализатор собирается один раз, ответ /protected не проходит повторную валидацию response_model
+user_serializer = TypeAdapter(UserSchema)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+class PreEncodedJSONResponse(JSONResponse):
+    # Тело уже закодировано в bytes и отдается как есть
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+def pre_encode(content: Any) -> bytes:
+    return to_json(content)
+
+
+def user_response(user: UserSchema) -> PreEncodedJSONResponse:
+    return PreEncodedJSONResponse(content=user_serializer.dump_json(user))
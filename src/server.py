@@ -0,0 +1,214 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event
+
+import uvicorn
+
+from src.config import web_settings
+from src.container import BASE_DIR, logger
+
+# Производственный запуск: родительский процесс создает N воркеров uvicorn, перезапускает упавшие,
+# пересоздает воркеры после заданного числа запросов и по SIGHUP плавно заменяет их по одному.
+#
+# Запуск: python -m src.server
+
+# src.main импортирует пакет v1 как модуль верхнего уровня
+sys.path.append(str(BASE_DIR / "src"))
+
+APP = "src.main:app"
+# Воркер, упавший быстрее этого времени после запуска, считается упавшим при старте
+MIN_WORKER_UPTIME = 5.0
+MAX_FAST_FAILURES = 5
+
+
+def resolve_loop() -> str:
+    if web_settings.WEBAPP_LOOP != "auto":
+        return web_settings.WEBAPP_LOOP
+    return "uvloop" if importlib.util.find_spec("uvloop") is not None else "asyncio"
+
+
+def resolve_http() -> str:
+    if web_settings.WEBAPP_HTTP != "auto":
+        return web_settings.WEBAPP_HTTP
+    return "httptools" if importlib.util.find_spec("httptools") is not None else "h11"
+
+
+def get_workers_count() -> int:
+    return web_settings.WEBAPP_WORKERS or os.cpu_count() or 1
+
+
+def create_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        app=APP,
+        host=web_settings.WEBAPP_HOST,
+        port=web_settings.WEBAPP_PORT,
+        loop=resolve_loop(),
+        http=resolve_http(),
+        backlog=web_settings.WEBAPP_BACKLOG,
+        timeout_graceful_shutdown=web_settings.WEBAPP_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+
+
+def create_socket(reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in web_settings.WEBAPP_HOST else socket.AF_INET
+    sock = socket.socket(family=family, type=socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((web_settings.WEBAPP_HOST, web_settings.WEBAPP_PORT))
+    sock.listen(web_settings.WEBAPP_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+class ReadyServer(uvicorn.Server):
+    def __init__(self, config: uvicorn.Config, ready: Event) -> None:
+        super().__init__(config=config)
+        self.ready = ready
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets=sockets)
+        # Сигнал родителю, что lifespan (прогрев) завершен и воркер принимает запросы
+        if not self.should_exit:
+            self.ready.set()
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket | None, max_requests: int | None, ready: Event) -> None:
+    config.limit_max_requests = max_requests
+    # В режиме SO_REUSEPORT каждый воркер слушает свой сокет, нагрузку между ними распределяет ядро
+    sockets = [sock if sock is not None else create_socket(reuse_port=True)]
+    ReadyServer(config=config, ready=ready).run(sockets=sockets)
+
+
+class Worker:
+    def __init__(self, context: multiprocessing.context.SpawnContext, config: uvicorn.Config, sock: socket.socket | None) -> None:
+        self.ready = context.Event()
+        max_requests = None
+        if web_settings.WEBAPP_MAX_REQUESTS:
+            # Разброс нужен, чтобы воркеры не перезапускались одновременно
+            max_requests = web_settings.WEBAPP_MAX_REQUESTS + random.randint(0, web_settings.WEBAPP_MAX_REQUESTS_JITTER)
+        self.process: SpawnProcess = context.Process(
+            target=run_worker,
+            kwargs={"config": config, "sock": sock, "max_requests": max_requests, "ready": self.ready},
+            daemon=False,
+        )
+        self.started_at = 0.0
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+        self.process.start()
+
+    def stop(self, timeout: float) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"Воркер [{self.process.pid}] не завершился за {timeout} с и будет убит")
+            self.process.kill()
+            self.process.join()
+
+
+class Supervisor:
+    def __init__(self, workers: int) -> None:
+        self.workers_count = workers
+        self.config = create_config()
+        self.reuse_port = web_settings.WEBAPP_SOCKET_MODE == "reuseport"
+        # В режиме inherit родитель один раз открывает сокет, и все воркеры принимают соединения с него
+        self.sock = None if self.reuse_port else create_socket(reuse_port=False)
+        self.context = multiprocessing.get_context("spawn")
+        self.workers: list[Worker] = []
+        self.should_exit = threading.Event()
+        self.should_restart = False
+        self.fast_failures = 0
+
+    def spawn_worker(self) -> Worker:
+        worker = Worker(context=self.context, config=self.config, sock=self.sock)
+        worker.start()
+        return worker
+
+    def handle_exit(self, sig: int, frame: object) -> None:
+        self.should_exit.set()
+
+    def handle_restart(self, sig: int, frame: object) -> None:
+        self.should_restart = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+        logger.info(
+            f"Запуск {self.workers_count} воркеров на {web_settings.WEBAPP_HOST}:{web_settings.WEBAPP_PORT} "
+            f"(loop={self.config.loop}, http={self.config.http}, socket={web_settings.WEBAPP_SOCKET_MODE})"
+        )
+        self.workers = [self.spawn_worker() for _ in range(self.workers_count)]
+        while not self.should_exit.wait(0.5):
+            if self.should_restart:
+                self.should_restart = False
+                self.rolling_restart()
+            self.replace_dead_workers()
+        self.stop_all()
+
+    def replace_dead_workers(self) -> None:
+        for index, worker in enumerate(self.workers):
+            if worker.process.is_alive() or self.should_exit.is_set():
+                continue
+            worker.process.join()
+            exitcode = worker.process.exitcode
+            if exitcode == 0:
+                # Воркер сам завершился после WEBAPP_MAX_REQUESTS запросов
+                logger.info(f"Воркер [{worker.process.pid}] пересоздается после лимита запросов")
+            else:
+                logger.warning(f"Воркер [{worker.process.pid}] упал с кодом {exitcode} и будет перезапущен")
+                if time.monotonic() - worker.started_at < MIN_WORKER_UPTIME:
+                    self.fast_failures += 1
+                    if self.fast_failures >= MAX_FAST_FAILURES:
+                        logger.error("Воркеры падают сразу после запуска, остановка сервера")
+                        self.should_exit.set()
+                        return
+                    time.sleep(min(2 ** self.fast_failures, 30))
+                else:
+                    self.fast_failures = 0
+            self.workers[index] = self.spawn_worker()
+
+    def rolling_restart(self) -> None:
+        # Новый воркер запускается и прогревается до остановки старого, поэтому сервер все время принимает запросы
+        logger.info("Плавный перезапуск воркеров")
+        for index, old_worker in enumerate(self.workers):
+            if self.should_exit.is_set():
+                return
+            new_worker = self.spawn_worker()
+            if not new_worker.ready.wait(timeout=web_settings.WEBAPP_WORKER_READY_TIMEOUT):
+                logger.error(f"Новый воркер [{new_worker.process.pid}] не стал готов, перезапуск прерван")
+                new_worker.stop(timeout=web_settings.WEBAPP_GRACEFUL_TIMEOUT)
+                return
+            old_worker.stop(timeout=web_settings.WEBAPP_GRACEFUL_TIMEOUT)
+            self.workers[index] = new_worker
+        logger.info("Плавный перезапуск воркеров завершен")
+
+    def stop_all(self) -> None:
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            worker.stop(timeout=web_settings.WEBAPP_GRACEFUL_TIMEOUT)
+        if self.sock is not None:
+            self.sock.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(process)d] %(message)s")
+    Supervisor(workers=get_workers_count()).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+import datetime
+from contextlib import AsyncExitStack
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi import APIRouter
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette import status
+from starlette.responses import JSONResponse
+
+from src.config import database_settings, tasks_settings
+from src.container import BASE_DIR, logger
+from src.database import create_db_and_tables, engine
+from src.redis_pool import create_redis_connection_pool
+from src.replicas import replica_router
+from src.v1.jwt.executor import crypto_executor
+from src.v1.jwt.keys import jwt_key_ring
+from src.v1.jwt.utils import decode_jwt, encode_jwt
+
+
+# Готовность экземпляра принимать трафик: включается только после прогрева и выключается в начале остановки
+class Readiness:
+    def __init__(self) -> None:
+        self.is_ready = False
+        self.ready_at: datetime.datetime | None = None
+
+    def set_ready(self) -> None:
+        self.is_ready = True
+        self.ready_at = datetime.datetime.now(datetime.UTC)
+
+    def set_not_ready(self) -> None:
+        self.is_ready = False
+
+
+readiness = Readiness()
+
+
+def get_expected_revisions() -> set[str]:
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def get_current_revisions(connection: Connection) -> set[str]:
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+async def check_schema_revision() -> None:
+    expected = get_expected_revisions()
+    async with engine.connect() as connection:
+        current = await connection.run_sync(get_current_revisions)
+    if current != expected:
+        raise RuntimeError(
+            f"Ревизия базы данных {sorted(current)} не совпадает с ревизией миграций {sorted(expected)}, "
+            f"выполните alembic upgrade head"
+        )
+    logger.info(f"Ревизия базы данных {sorted(current)} актуальна")
+
+
+async def prepare_schema() -> None:
+    if database_settings.POSTGRES_STARTUP_SCHEMA == "check_revision":
+        await check_schema_revision()
+        return
+    await create_db_and_tables()
+
+
+async def warm_up_engine(warm_engine: AsyncEngine, connections: int) -> None:
+    # Соединения открываются одновременно, чтобы пул действительно создал их, а не переиспользовал одно
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(*(stack.enter_async_context(warm_engine.connect()) for _ in range(connections)))
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in opened))
+
+
+async def warm_up_database() -> None:
+    connections = min(database_settings.POSTGRES_WARMUP_CONNECTIONS, database_settings.POSTGRES_POOL_SIZE)
+    if connections <= 0:
+        return
+    await warm_up_engine(warm_engine=engine, connections=connections)
+    for replica in replica_router.replicas:
+        try:
+            await warm_up_engine(warm_engine=replica.engine, connections=connections)
+        except Exception as e:
+            # Недоступная реплика не мешает запуску, проверка здоровья вернет ее в ротацию позже
+            replica_router.mark_unhealthy(replica.engine)
+            logger.warning(f"Не удалось прогреть реплику {replica.url}: {e!r}")
+
+
+async def warm_up_redis() -> None:
+    connections = min(tasks_settings.REDIS_WARMUP_CONNECTIONS, tasks_settings.REDIS_MAX_CONNECTIONS)
+    pool = create_redis_connection_pool()
+    opened = [await pool.get_connection("PING") for _ in range(connections)]
+    for connection in opened:
+        await pool.release(connection)
+
+
+def sign_and_verify_warmup_token() -> None:
+    token = encode_jwt(payload={"type": "warmup"}, expire_timedelta=datetime.timedelta(minutes=1))
+    decode_jwt(token=token, public_key=jwt_key_ring.signing_key.public_key, algorithm=jwt_key_ring.signing_key.algorithm)
+
+
+async def preload_jwt_keys() -> None:
+    # Связка ключей читается с диска при импорте, пробная подпись в каждом потоке пула
+    # прогревает криптобиблиотеку и заранее создает потоки
+    await asyncio.gather(*(crypto_executor.run(sign_and_verify_warmup_token) for _ in range(crypto_executor.max_workers)))
+
+
+async def warm_up() -> None:
+    await prepare_schema()
+    await asyncio.gather(warm_up_database(), warm_up_redis(), preload_jwt_keys())
+    readiness.set_ready()
+    logger.info("Прогрев завершен, экземпляр готов принимать трафик")
+
+
+router = APIRouter(tags=["READINESS"])
+
+
+@router.get('/ready', include_in_schema=False)
+async def ready() -> JSONResponse:
+    if not readiness.is_ready:
+        return JSONResponse(content={"status": "not ready"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return JSONResponse(content={"status": "ready"}, status_code=status.HTTP_200_OK)
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Literal, TextIO
+
+import asyncpg
+import bcrypt
+from pydantic import Field, ValidationError, model_validator
+
+from src.config import database_settings
+from src.schemas import UserBaseSchema
+from src.v1.jwt.config import password_settings
+
+# Массовый перенос пользователей в обход ORM.
+# Импорт: строки CSV или NDJSON проверяются, пароли хэшируются в пуле процессов (или берутся готовые bcrypt хэши),
+# пачки загружаются через COPY во временную таблицу и переносятся в users без уже занятых email.
+# Экспорт: COPY ... TO STDOUT для csv и серверный курсор для ndjson, таблица не загружается в память целиком.
+#
+# Запуск:
+#   python -m src.user_transfer import users.csv --rejects rejects.ndjson
+#   python -m src.user_transfer export users.ndjson --with-password-hash
+
+BCRYPT_HASH_PATTERN = r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$"
+
+CREATE_STAGING_TABLE = """
+CREATE TEMP TABLE import_users (
+    email varchar NOT NULL,
+    password bytea NOT NULL,
+    first_name varchar(256) NOT NULL,
+    is_admin boolean NOT NULL,
+    is_stuff boolean NOT NULL,
+    is_active boolean NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+STAGING_COLUMNS = ("email", "password", "first_name", "is_admin", "is_stuff", "is_active")
+INSERT_FROM_STAGING = """
+INSERT INTO users (email, password, first_name, is_admin, is_stuff, is_active)
+SELECT email, password, first_name, is_admin, is_stuff, is_active FROM import_users
+ON CONFLICT (email) DO NOTHING
+RETURNING email
+"""
+EXPORT_COLUMNS = "id, email, first_name, is_admin, is_stuff, is_active, created_at, updated_at"
+
+
+class UserImportSchema(UserBaseSchema):
+    password: str | None = Field(default=None, min_length=8)
+    # Готовый bcrypt хэш, например из экспорта другого окружения
+    password_hash: str | None = Field(default=None, pattern=BCRYPT_HASH_PATTERN)
+    is_admin: bool = False
+    is_stuff: bool = False
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def check_password(self) -> "UserImportSchema":
+        if self.password is None and self.password_hash is None:
+            raise ValueError("нужен password или password_hash")
+        return self
+
+
+def hash_passwords(passwords: list[str], rounds: int) -> list[bytes]:
+    # Выполняется в процессе пула
+    return [bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)) for password in passwords]
+
+
+def detect_format(path: Path) -> Literal["csv", "ndjson"]:
+    return "csv" if path.suffix.lower() == ".csv" else "ndjson"
+
+
+def read_rows(file: TextIO, file_format: Literal["csv", "ndjson"]) -> Iterator[tuple[int, dict[str, Any] | None]]:
+    # Номер строки нужен для отчета об отклоненных записях, None - строку не удалось разобрать
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def parse_row(row: dict[str, Any]) -> UserImportSchema:
+    # Пустые поля CSV означают значение по умолчанию
+    data = {key: value for key, value in row.items() if key is not None and value not in ("", None)}
+    return UserImportSchema.model_validate(data)
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'row'}: {item['msg']}" for item in error.errors())
+
+
+class UserImporter:
+    def __init__(self, connection: asyncpg.Connection, pool: ProcessPoolExecutor, workers: int, rounds: int, rejects: TextIO) -> None:
+        self.connection = connection
+        self.pool = pool
+        self.workers = workers
+        self.rounds = rounds
+        self.rejects = rejects
+        self.processed = 0
+        self.imported = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+
+    def reject(self, line: int, reason: str, email: Any = None) -> None:
+        self.rejected += 1
+        self.rejects.write(json.dumps({"line": line, "email": email, "reason": reason}, ensure_ascii=False) + "\n")
+
+    async def prepare(self, batch: Iterable[tuple[int, dict[str, Any] | None]]) -> list[tuple[int, UserImportSchema]]:
+        users: list[tuple[int, UserImportSchema]] = []
+        seen: set[str] = set()
+        for line, row in batch:
+            self.processed += 1
+            if row is None:
+                self.reject(line=line, reason="строку не удалось разобрать")
+                continue
+            try:
+                user = parse_row(row)
+            except ValidationError as e:
+                self.reject(line=line, reason=format_validation_error(e), email=row.get("email"))
+                continue
+            if user.email in seen:
+                self.reject(line=line, reason="email повторяется в файле", email=user.email)
+                continue
+            seen.add(user.email)
+            users.append((line, user))
+        await self.hash_passwords([user for _, user in users if user.password_hash is None])
+        return users
+
+    async def hash_passwords(self, users: list[UserImportSchema]) -> None:
+        if not users:
+            return
+        loop = asyncio.get_running_loop()
+        chunk_size = math.ceil(len(users) / self.workers)
+        chunks = [users[index:index + chunk_size] for index in range(0, len(users), chunk_size)]
+        hashed_chunks = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, hash_passwords, [user.password for user in chunk], self.rounds)
+            for chunk in chunks
+        ))
+        for chunk, hashes in zip(chunks, hashed_chunks):
+            for user, password_hash in zip(chunk, hashes):
+                user.password_hash = password_hash.decode()
+
+    async def copy(self, users: list[tuple[int, UserImportSchema]]) -> None:
+        if users:
+            records = [
+                (user.email, user.password_hash.encode(), user.first_name, user.is_admin, user.is_stuff, user.is_active)
+                for _, user in users
+            ]
+            # Каждая пачка в своей транзакции: уже загруженные пачки сохраняются, если импорт прервется
+            async with self.connection.transaction():
+                await self.connection.copy_records_to_table("import_users", records=records, columns=STAGING_COLUMNS)
+                inserted = {record["email"] for record in await self.connection.fetch(INSERT_FROM_STAGING)}
+            self.imported += len(inserted)
+            for line, user in users:
+                if user.email not in inserted:
+                    self.reject(line=line, reason="email уже занят", email=user.email)
+        self.report()
+
+    def report(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        print(
+            f"обработано {self.processed}, импортировано {self.imported}, отклонено {self.rejected}, "
+            f"{self.processed / elapsed if elapsed else 0:.0f} строк/с",
+            file=sys.stderr,
+        )
+
+
+async def connect() -> asyncpg.Connection:
+    return await asyncpg.connect(
+        host=database_settings.POSTGRES_HOST,
+        port=database_settings.POSTGRES_PORT,
+        user=database_settings.POSTGRES_USER,
+        password=database_settings.POSTGRES_PASSWORD,
+        database=database_settings.POSTGRES_DB,
+        timeout=database_settings.POSTGRES_CONNECT_TIMEOUT,
+    )
+
+
+def get_rejects_path(path: Path) -> Path:
+    # Отчет по умолчанию пишется рядом с файлом импорта, а не в stderr вперемешку с прогрессом
+    return path.with_name(f"{path.name}.rejects.ndjson")
+
+
+async def import_users(args: argparse.Namespace) -> None:
+    file_format = args.format or detect_format(args.path)
+    rejects_path = args.rejects or get_rejects_path(args.path)
+    connection = await connect()
+    try:
+        await connection.execute(CREATE_STAGING_TABLE)
+        with (
+            open(args.path, encoding="utf-8", newline="") as file,
+            open(rejects_path, "w", encoding="utf-8") as rejects,
+            ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool,
+        ):
+            importer = UserImporter(
+                connection=connection, pool=pool, workers=args.workers, rounds=args.rounds, rejects=rejects
+            )
+            copy_task: asyncio.Task | None = None
+            for batch in itertools.batched(read_rows(file, file_format), args.batch_size):
+                users = await importer.prepare(batch)
+                # Следующая пачка хэшируется, пока предыдущая загружается в базу данных
+                if copy_task is not None:
+                    await copy_task
+                copy_task = asyncio.create_task(importer.copy(users))
+            if copy_task is not None:
+                await copy_task
+        if importer.rejected:
+            print(f"отклоненные строки записаны в {rejects_path}", file=sys.stderr)
+    finally:
+        await connection.close()
+
+
+async def export_users(args: argparse.Namespace) -> None:
+    file_format = args.format or detect_format(args.path)
+    columns = EXPORT_COLUMNS
+    if args.with_password_hash:
+        columns += ", convert_from(password, 'UTF8') AS password_hash"
+    query = f"SELECT {columns} FROM users ORDER BY id"
+    connection = await connect()
+    try:
+        if file_format == "csv":
+            with open(args.path, "wb") as file:
+                status = await connection.copy_from_query(query, output=file, format="csv", header=True)
+            print(f"экспортировано {status.split()[-1]}", file=sys.stderr)
+            return
+        exported = 0
+        with open(args.path, "w", encoding="utf-8") as file:
+            # Серверный курсор отдает строки пачками по batch_size
+            async with connection.transaction():
+                async for record in connection.cursor(query, prefetch=args.batch_size):
+                    file.write(json.dumps(dict(record), default=lambda value: value.isoformat(), ensure_ascii=False) + "\n")
+                    exported += 1
+                    if exported % args.batch_size == 0:
+                        print(f"экспортировано {exported}", file=sys.stderr)
+        print(f"экспортировано {exported}", file=sys.stderr)
+    finally:
+        await connection.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Массовый импорт и экспорт пользователей через COPY")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="загрузить пользователей из CSV или NDJSON")
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--format", choices=["csv", "ndjson"], help="по умолчанию по расширению файла")
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="процессов для bcrypt")
+    import_parser.add_argument("--rounds", type=int, default=password_settings.bcrypt_rounds, help="стоимость bcrypt")
+    import_parser.add_argument("--rejects", type=Path, help="NDJSON файл для отклоненных строк, по умолчанию <path>.rejects.ndjson")
+
+    export_parser = subparsers.add_parser("export", help="выгрузить пользователей в CSV или NDJSON")
+    export_parser.add_argument("path", type=Path)
+    export_parser.add_argument("--format", choices=["csv", "ndjson"], help="по умолчанию по расширению файла")
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+    export_parser.add_argument("--with-password-hash", action="store_true", help="добавить bcrypt хэши паролей")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "import":
+        asyncio.run(import_users(args))
+    else:
+        asyncio.run(export_users(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,17 @@
 from fastapi import HTTPException
 from pydantic import EmailStr
-from sqlalchemy import select
+from typing import Literal
+
+from sqlalchemy import Executable, Result, Select, bindparam, select, update
 
 from src.schemas import UserSchema, UserPasswordSchema
 from src.database import AsyncSessionDep
 from src.models import UserModel
 from src.exceptions import user_not_found_exception, reset_user_password_exception
 from src.container import logger
+from src.cache import user_cache
+from src.database import async_session_factory
+from src.replicas import replica_router
 
 
 async def create_user(user: UserModel, session: AsyncSessionDep, exception: HTTPException) -> UserSchema:
@@ -18,32 +23,75 @@ async def create_user(user: UserModel, session: AsyncSessionDep, exception: HTTP
         raise exception
     await session.refresh(user)
     logger.info(f"{user.email=}")
+    await user_cache.invalidate(user.id)
+    await replica_router.pin_user(user_id=user.id, email=user.email)
 
 
     return UserSchema.model_validate(user, from_attributes=True)
 
 
-async def select_user_instance(session: AsyncSessionDep, **filters) -> UserModel:
-    statement = select(UserModel).filter_by(**filters)
+# Колонки для чтения пользователя через Core без создания ORM сущности, пароль выбирается только по запросу
+USER_COLUMNS = tuple(UserModel.__table__.c[name] for name in UserSchema.model_fields)
+USER_PASSWORD_COLUMNS = USER_COLUMNS + (UserModel.__table__.c.password,)
+
+# Запросы по набору фильтров (id=, email=) строятся один раз с bindparam, при вызове меняются только параметры.
+# Ключ кэша SQLAlchemy и текст для подготовленного запроса asyncpg у них всегда одинаковые.
+user_statement_cache: dict[tuple[str, tuple[str, ...]], Select] = {}
+
+
+def get_user_statement(projection: Literal["entity", "user", "password"], filter_names: tuple[str, ...]) -> Select:
+    key = (projection, filter_names)
+    statement = user_statement_cache.get(key)
+    if statement is None:
+        if projection == "entity":
+            statement = select(UserModel)
+        else:
+            statement = select(*(USER_PASSWORD_COLUMNS if projection == "password" else USER_COLUMNS))
+        statement = statement.where(*(UserModel.__table__.c[name] == bindparam(name) for name in filter_names))
+        user_statement_cache[key] = statement
+    return statement
+
+
+async def execute_user_statement(session: AsyncSessionDep, statement: Executable, **filters) -> Result:
+    if session.info.get("read_only"):
+        return await execute_user_statement_on_replica(session=session, statement=statement, **filters)
     try:
-        result = await session.execute(statement)
+        return await session.execute(statement, filters)
     except:
         raise user_not_found_exception
-    user = result.scalar_one_or_none()
 
-    return user
+
+async def execute_user_statement_on_replica(session: AsyncSessionDep, statement: Executable, **filters) -> Result:
+    # Недавно измененный пользователь читается из основной базы, пока изменения не дошли до реплик
+    if not await replica_router.is_pinned(**filters):
+        try:
+            return await session.execute(statement, filters)
+        except Exception as e:
+            logger.warning(f"Ошибка чтения пользователя с реплики, запрос повторяется в основной базе: {e!r}")
+            replica_router.mark_unhealthy(session.bind)
+    async with async_session_factory() as primary_session:
+        try:
+            return await primary_session.execute(statement, filters)
+        except:
+            raise user_not_found_exception
+
+
+async def select_user_instance(session: AsyncSessionDep, **filters) -> UserModel:
+    statement = get_user_statement(projection="entity", filter_names=tuple(filters))
+    result = await execute_user_statement(session=session, statement=statement, **filters)
+    return result.scalar_one_or_none()
 
 
 async def select_user(session: AsyncSessionDep, get_password: bool = False, **filters) -> UserPasswordSchema | UserSchema | None:
-    user = await select_user_instance(session=session, **filters)
+    schema = UserPasswordSchema if get_password else UserSchema
+    statement = get_user_statement(projection="password" if get_password else "user", filter_names=tuple(filters))
+    result = await execute_user_statement(session=session, statement=statement, **filters)
+    row = result.mappings().one_or_none()
 
-    if not user:
+    if row is None:
         return None
-
-    if get_password:
-        return UserPasswordSchema.model_validate(user, from_attributes=True)
-    else:
-        return UserSchema.model_validate(user, from_attributes=True)
+    # Строка из базы данных уже соответствует схеме, поэтому повторная валидация не нужна
+    return schema.model_construct(**row)
 
 
 async def update_user_with_email(session: AsyncSessionDep, user_email: EmailStr, show_user: bool=False, **attrs) -> UserSchema | None:
@@ -64,16 +112,25 @@ async def update_user_with_email(session: AsyncSessionDep, user_email: EmailStr,
         await session.commit()
     except Exception:
         raise reset_user_password_exception
+    # Сброс закэшированного пользователя после изменения его данных
+    await user_cache.invalidate(user.id)
+    await replica_router.pin_user(user_id=user.id, email=user.email)
 
     if not show_user:
         return None
 
-    session.refresh(user)
+    await session.refresh(user)
 
     return UserPasswordSchema.model_validate(user, from_attributes=True)
 
 
-
-
-
-
+async def update_user_password_if_unchanged(session: AsyncSessionDep, user_id: int, old_password: bytes, new_password: bytes) -> bool:
+    # Пароль заменяется, только если хэш не изменился с момента чтения (например, сбросом пароля)
+    statement = (
+        update(UserModel)
+        .where(UserModel.id == user_id, UserModel.password == old_password)
+        .values(password=new_password)
+    )
+    result = await session.execute(statement)
+    await session.commit()
+    return result.rowcount == 1
@@ -1,7 +1,7 @@
-__all__ = ("router", )
+__all__ = ("router", "jwks_router")
 
 
-from .jwt import router as jwt_router
+from .jwt import router as jwt_router, jwks_router
 from .email import router as email_router
 from .auth import router as auth_router
 from .admin import router as admin_router
@@ -1,6 +1,15 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
+from starlette.responses import JSONResponse
+from src.cache import user_cache
+from src.database import get_compiled_cache_stats, get_pool_stats
+from src.replicas import replica_router
+from src.responses import user_response
 from src.schemas import UserSchema
 from src.v1.jwt.dependencies import get_current_admin_user_with_access_token
+from src.v1.jwt.executor import crypto_executor
+from src.v1.jwt.utils import verified_token_cache
 
 
 router = APIRouter()
@@ -9,5 +18,33 @@ router = APIRouter()
 @router.get('/protected', response_model=UserSchema)
 async def protected(
         user: UserSchema = Depends(get_current_admin_user_with_access_token),
-) -> UserSchema:
-    return user
\ No newline at end of file
+) -> JSONResponse:
+    return user_response(user)
+
+
+@router.get('/crypto-executor')
+async def crypto_executor_stats(
+        user: UserSchema = Depends(get_current_admin_user_with_access_token),
+) -> dict[str, int]:
+    return crypto_executor.stats()
+
+
+@router.get('/user-cache')
+async def user_cache_stats(
+        user: UserSchema = Depends(get_current_admin_user_with_access_token),
+) -> dict[str, Any]:
+    return user_cache.stats()
+
+
+@router.get('/token-cache')
+async def token_cache_stats(
+        user: UserSchema = Depends(get_current_admin_user_with_access_token),
+) -> dict[str, int | float]:
+    return verified_token_cache.stats()
+
+
+@router.get('/db-pool')
+async def db_pool_stats(
+        user: UserSchema = Depends(get_current_admin_user_with_access_token),
+) -> dict[str, Any]:
+    return {**get_pool_stats(), "compiled_cache": get_compiled_cache_stats(), "replicas": replica_router.stats()}
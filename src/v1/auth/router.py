@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends
 from redis.asyncio import Redis
 from starlette import status
 from starlette.responses import JSONResponse
@@ -7,9 +7,13 @@ from src.utils import select_user, update_user_with_email
 from src.v1.email.utils import get_redis_pool
 from src.v1.email.dependencies import validate_email_code
 from src.v1.jwt.dependencies import get_current_user_with_access_token
-from src.v1.jwt.utils import hash_password, set_tokens_in_response, validate_password
-from src.v1.email.config import email_settings
+from src.v1.jwt.utils import hash_password_async, password_needs_rehash, set_tokens_in_response_async, validate_password_async
+from src.v1.jwt.config import password_settings
+from src.v1.jwt.revocation import token_revocation_list
+from src.v1.auth.utils import rehash_user_password
+from src.v1.email.codes import reset_password_key_store, verification_code_store
 from src.database import AsyncSessionDep
+from src.replicas import ReadAsyncSessionDep
 from src.utils import create_user
 from src.schemas import UserSchema
 from src.models import UserModel
@@ -24,9 +28,15 @@ from src.exceptions import (
     invalid_password_exception, reset_user_password_exception
 )
 from src.v1.auth.exceptions import invalid_reset_password_key_exception, different_passwords_exception, current_user_yet_exists_exception
+from src.responses import PreEncodedJSONResponse, pre_encode, user_response
 
 router = APIRouter()
 
+# Неизменные тела ответов кодируются один раз
+SIGNUP_MESSAGE = pre_encode({"message": "Регистрация прошла успешно."})
+LOGIN_MESSAGE = pre_encode({"message": "Авторизация прошла успешно."})
+RESET_PASSWORD_MESSAGE = pre_encode({"message": "Пароль был успешно обновлен."})
+
 
 @router.post('/signup')
 async def signup(
@@ -34,66 +44,69 @@ async def signup(
         user_data: EmailPasswordFirstNameVerificationCodeSchema,
         redis_pool: Redis = Depends(get_redis_pool),
 ) -> JSONResponse:
-    verification_code_redis_key = f"{email_settings.verification_code_name}:{user_data.email}"
     # Валидация email кода
     email_code = validate_email_code(email_code=user_data.email_code)
-    # Получение email кода из redis
-    stored_code: str = await redis_pool.get(verification_code_redis_key)
-    # Проверка email кода на стороне сервера и кода, который отправил пользователь
-    if stored_code != email_code:
-        raise invalid_email_code_exception
-    # Создание экземпляра пользователя в базе данных
-    user: UserSchema = await create_user(
-        user=UserModel(
-            email=user_data.email,
-            password=hash_password(password=user_data.password),
-            first_name=user_data.first_name
-        ),
-        session=session,
-        exception=current_user_yet_exists_exception
+    # Проверка и одновременное удаление email кода в redis
+    await verification_code_store.consume_or_raise(
+        redis=redis_pool, email=str(user_data.email), code=email_code, exception=invalid_email_code_exception
     )
-    # Удаление email кода из redis
-    await redis_pool.delete(verification_code_redis_key)
+    # Создание экземпляра пользователя в базе данных
+    try:
+        user: UserSchema = await create_user(
+            user=UserModel(
+                email=user_data.email,
+                password=await hash_password_async(password=user_data.password),
+                first_name=user_data.first_name
+            ),
+            session=session,
+            exception=current_user_yet_exists_exception
+        )
+    except Exception:
+        # Код удаляется только после успешной регистрации
+        await verification_code_store.restore(redis=redis_pool, email=str(user_data.email), code=email_code)
+        raise
     # Статус код и контент ответа
-    response: JSONResponse = JSONResponse(
-        content={"message": "Регистрация прошла успешно."},
+    response: JSONResponse = PreEncodedJSONResponse(
+        content=SIGNUP_MESSAGE,
         status_code=status.HTTP_201_CREATED
     )
     # Настройка токенов и ответа сервера
-    return set_tokens_in_response(response=response, user=user)
+    return await set_tokens_in_response_async(response=response, user=user)
 
 
 @router.post('/login')
 async def login(
-    session: AsyncSessionDep,
+    session: ReadAsyncSessionDep,
     user_data: EmailPasswordVerificationCodeSchema,
+    background_tasks: BackgroundTasks,
     redis_pool: Redis = Depends(get_redis_pool),
 ) -> JSONResponse:
-    verification_code_redis_key = f"{email_settings.verification_code_name}:{user_data.email}"
     # Поиск пользователя в базе данных по почте
     user = await select_user(session=session, get_password=True, email=user_data.email)
 
     if not user:
         raise user_not_found_exception
     # Проверка пароля пользователя из базы даннх и пароля, который отправил сам пользователь
-    if not validate_password(password=user_data.password, hashed_password=user.password):
+    if not await validate_password_async(password=user_data.password, hashed_password=user.password):
         raise invalid_password_exception
     # Валидация email кода
     email_code = validate_email_code(email_code=user_data.email_code)
-    # Получение email кода из redis
-    stored_code: str = await redis_pool.get(verification_code_redis_key)
-    # Проверка email кода на стороне сервера и кода, который отправил пользователь
-    if stored_code != email_code:
-        raise invalid_email_code_exception
-    # Удаление email кода из redis
-    await redis_pool.delete(verification_code_redis_key)
+    # Проверка и одновременное удаление email кода в redis
+    await verification_code_store.consume_or_raise(
+        redis=redis_pool, email=str(user_data.email), code=email_code, exception=invalid_email_code_exception
+    )
+    # Пароль перехешируется после ответа, если стоимость bcrypt в настройках изменилась
+    if password_settings.rehash_on_login and password_needs_rehash(hashed_password=user.password):
+        background_tasks.add_task(
+            rehash_user_password, user_id=user.id, password=user_data.password, hashed_password=user.password
+        )
     # Статус код и контент ответа
-    response: JSONResponse = JSONResponse(
-        content={"message": "Авторизация прошла успешно."},
+    response: JSONResponse = PreEncodedJSONResponse(
+        content=LOGIN_MESSAGE,
         status_code=status.HTTP_200_OK
     )
     # Настройка токенов и ответа сервера
-    return set_tokens_in_response(response=response, user=user)
+    return await set_tokens_in_response_async(response=response, user=user)
 
 
 @router.post('/reset-password/{key}')
@@ -103,22 +116,20 @@ async def reset_password(
         user_data: EmailTwoPasswordsSchema,
         redis_pool: Redis = Depends(get_redis_pool)
 ) -> JSONResponse:
-    reset_password_redis_key = f"{email_settings.reset_password_name}:{user_data.email}"
-    # Получение email кода из redis
-    stored_reset_password_key: str = await redis_pool.get(reset_password_redis_key)
     # Проверка на совпадение первого и второго пароля
     if user_data.password != user_data.password2:
         raise different_passwords_exception
-    # Проверка email ключа для сброса пароля на стороне сервера и ключа, который и есть endpoint - /{key}
-    if key != stored_reset_password_key:
-        raise invalid_reset_password_key_exception
-
-    await update_user_with_email(session=session, user_email=user_data.email, show_user=False, password=hash_password(password=user_data.password))
+    # Проверка и одновременное удаление ключа сброса пароля, который и есть endpoint - /{key}
+    await reset_password_key_store.consume_or_raise(
+        redis=redis_pool, email=str(user_data.email), code=key, exception=invalid_reset_password_key_exception
+    )
 
-    await redis_pool.delete(reset_password_redis_key)
+    user = await update_user_with_email(session=session, user_email=user_data.email, show_user=True, password=await hash_password_async(password=user_data.password))
+    # После смены пароля ранее выданные токены больше не действуют
+    await token_revocation_list.revoke_user(user_id=user.id)
 
-    return JSONResponse(
-        content={"message": "Пароль был успешно обновлен."},
+    return PreEncodedJSONResponse(
+        content=RESET_PASSWORD_MESSAGE,
         status_code=status.HTTP_200_OK
     )
 
@@ -126,5 +137,5 @@ async def reset_password(
 @router.get('/protected', response_model=UserSchema)
 async def protected(
         user: UserSchema = Depends(get_current_user_with_access_token)
-) -> UserSchema:
-    return user
+) -> JSONResponse:
+    return user_response(user)
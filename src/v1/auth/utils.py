@@ -0,0 +1,22 @@
+from src.container import logger
+from src.database import async_session_factory
+from src.utils import update_user_password_if_unchanged
+from src.v1.jwt.utils import get_password_rounds, hash_password_async
+
+
+async def rehash_user_password(user_id: int, password: str, hashed_password: bytes) -> None:
+    # Выполняется в фоне после ответа на вход, ошибки не влияют на пользователя
+    try:
+        new_hashed_password = await hash_password_async(password=password)
+        async with async_session_factory() as session:
+            is_updated = await update_user_password_if_unchanged(
+                session=session, user_id=user_id, old_password=hashed_password, new_password=new_hashed_password
+            )
+    except Exception as e:
+        logger.warning(f"Не удалось перехешировать пароль пользователя {user_id}: {e!r}")
+        return
+    if is_updated:
+        logger.info(
+            f"Пароль пользователя {user_id} перехеширован со стоимостью {get_password_rounds(new_hashed_password)} "
+            f"вместо {get_password_rounds(hashed_password)}"
+        )
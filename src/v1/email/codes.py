@@ -0,0 +1,151 @@
+import enum
+import hashlib
+import hmac
+import math
+from datetime import timedelta
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from src.exceptions import code_attempts_exceeded_exception
+from .config import email_settings
+
+# Хранилище одноразовых кодов: в redis лежит только hmac кода и счетчик неудачных попыток.
+# Выдача и проверка выполняются одним lua скриптом, поэтому один код нельзя принять дважды.
+
+# KEYS: ключ кода, ключ паузы перед повторной отправкой; ARGV: hmac, ttl в мс, пауза в мс.
+# Возвращает 0 или сколько мс осталось до возможности повторной отправки.
+ISSUE_SCRIPT = """
+local cooldown = redis.call('PTTL', KEYS[2])
+if cooldown > 0 then
+    return cooldown
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'hash', ARGV[1], 'attempts', 0)
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('SET', KEYS[2], 1, 'PX', ARGV[3])
+end
+return 0
+"""
+
+# KEYS: ключ кода; ARGV: hmac, максимум попыток.
+# Верный код удаляется в том же вызове, неверный увеличивает счетчик попыток.
+CONSUME_SCRIPT = """
+local stored = redis.call('HMGET', KEYS[1], 'hash', 'attempts')
+if not stored[1] then
+    return -1
+end
+local max_attempts = tonumber(ARGV[2])
+if tonumber(stored[2]) >= max_attempts then
+    return -2
+end
+if stored[1] == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+if redis.call('HINCRBY', KEYS[1], 'attempts', 1) >= max_attempts then
+    return -2
+end
+return 0
+"""
+
+# KEYS: ключ кода; ARGV: hmac, ttl в мс.
+# Возвращает принятый код, если за это время не был выдан новый.
+RESTORE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'hash', ARGV[1], 'attempts', 0)
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class CodeStatus(enum.IntEnum):
+    LOCKED = -2
+    MISSING = -1
+    INVALID = 0
+    VALID = 1
+
+
+class OneTimeCodeStore:
+    def __init__(self, name: str, ttl: timedelta, resend_cooldown: timedelta, max_attempts: int, secret: str) -> None:
+        self.name = name
+        self.ttl_ms = math.ceil(ttl.total_seconds() * 1000)
+        self.resend_cooldown_ms = math.ceil(resend_cooldown.total_seconds() * 1000)
+        self.max_attempts = max_attempts
+        self.secret = secret.encode()
+        self._issue_script: AsyncScript | None = None
+        self._consume_script: AsyncScript | None = None
+        self._restore_script: AsyncScript | None = None
+
+    def _key(self, email: str) -> str:
+        return f"{self.name}:{email.lower()}"
+
+    def _cooldown_key(self, email: str) -> str:
+        return f"{self.name}:cooldown:{email.lower()}"
+
+    def _hash(self, email: str, code: str) -> str:
+        return hmac.new(self.secret, f"{email.lower()}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    async def cooldown(self, redis: Redis, email: str) -> float:
+        # Быстрая проверка паузы до поиска пользователя и проверки пароля, атомарно пауза проверяется в issue
+        cooldown_ms = await redis.pttl(self._cooldown_key(email))
+        return max(int(cooldown_ms), 0) / 1000
+
+    async def issue(self, redis: Redis, email: str, code: str) -> float:
+        # Возвращает 0, если код сохранен, иначе сколько секунд осталось до повторной отправки
+        if self._issue_script is None:
+            self._issue_script = redis.register_script(ISSUE_SCRIPT)
+        cooldown_ms = await self._issue_script(
+            keys=[self._key(email), self._cooldown_key(email)],
+            args=[self._hash(email, code), self.ttl_ms, self.resend_cooldown_ms],
+            client=redis,
+        )
+        return int(cooldown_ms) / 1000
+
+    async def consume(self, redis: Redis, email: str, code: str) -> CodeStatus:
+        if self._consume_script is None:
+            self._consume_script = redis.register_script(CONSUME_SCRIPT)
+        status = await self._consume_script(
+            keys=[self._key(email)],
+            args=[self._hash(email, code), self.max_attempts],
+            client=redis,
+        )
+        return CodeStatus(int(status))
+
+    async def consume_or_raise(self, redis: Redis, email: str, code: str, exception: HTTPException) -> None:
+        status = await self.consume(redis=redis, email=email, code=code)
+        if status == CodeStatus.LOCKED:
+            raise code_attempts_exceeded_exception
+        if status != CodeStatus.VALID:
+            raise exception
+
+    async def restore(self, redis: Redis, email: str, code: str) -> bool:
+        # Возвращает код после неудачного действия, чтобы не ждать паузы перед повторной отправкой
+        if self._restore_script is None:
+            self._restore_script = redis.register_script(RESTORE_SCRIPT)
+        restored = await self._restore_script(
+            keys=[self._key(email)],
+            args=[self._hash(email, code), self.ttl_ms],
+            client=redis,
+        )
+        return bool(restored)
+
+
+verification_code_store = OneTimeCodeStore(
+    name=email_settings.verification_code_name,
+    ttl=email_settings.expire_time,
+    resend_cooldown=email_settings.code_resend_cooldown,
+    max_attempts=email_settings.code_max_attempts,
+    secret=email_settings.code_hash_secret,
+)
+reset_password_key_store = OneTimeCodeStore(
+    name=email_settings.reset_password_name,
+    ttl=email_settings.expire_time,
+    resend_cooldown=email_settings.code_resend_cooldown,
+    max_attempts=email_settings.code_max_attempts,
+    secret=email_settings.code_hash_secret,
+)
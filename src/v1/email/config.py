@@ -1,5 +1,7 @@
 from datetime import timedelta
+from pathlib import Path
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from src.container import BASE_DIR
@@ -12,6 +14,47 @@ class EmailSettings(BaseSettings):
     expire_time: timedelta = timedelta(minutes=2)
     verification_code_name: str = "code"
     reset_password_name: str = "password"
+    code_resend_cooldown: timedelta = timedelta(minutes=1)
+    code_max_attempts: int = 5
+    # Ключ hmac для кодов и ключей сброса пароля, хранящихся в redis. Обязателен: с пустым ключом
+    # все 10^6 кодов из дампа redis перебираются за миллисекунды
+    code_hash_secret: str = Field(min_length=32)
+
+    templates_dir: Path = BASE_DIR / "templates" / "email"
+    # Каталог для байткода jinja2, по умолчанию временный каталог системы
+    templates_bytecode_cache_dir: Path | None = None
+
+    smtp_host: str = "smtp.gmail.com"
+    smtp_port: int = 587
+    smtp_timeout: float = 30.0
+    smtp_pool_size: int = 2
+    smtp_max_messages_per_connection: int = 100
+    smtp_max_connection_age: timedelta = timedelta(minutes=5)
+
+    batch_enabled: bool = False
+    batch_size: int = 50
+    batch_max_delay: timedelta = timedelta(milliseconds=200)
+    batch_redis_key: str = "email:batch"
+    # Метка поставленной задачи flush_email_batch, живет 2 * batch_max_delay
+    batch_scheduled_redis_key: str = "email:batch:scheduled"
+    batch_retry_delay: timedelta = timedelta(seconds=30)
+
+    async_worker_queue: str = "celery"
+    async_worker_concurrency: int = 200
+    async_worker_smtp_connections: int = 10
+    # Задачи с eta ждут в очередях {async_worker_delay_queue}.{ttl в мс} и по истечении ttl возвращаются
+    # в async_worker_queue. rabbitmq снимает сообщения только с головы очереди, поэтому у каждой очереди
+    # один ttl на все сообщения: короткий flush_email_batch не ждет за 30 секундным повтором отправки
+    async_worker_delay_queue: str = "celery.async_worker.delay"
+    async_worker_delay_buckets: list[timedelta] = [
+        timedelta(milliseconds=100),
+        timedelta(seconds=1),
+        timedelta(seconds=5),
+        timedelta(seconds=30),
+        timedelta(minutes=5),
+    ]
+    # Задачи, которые асинхронный воркер не поддерживает
+    async_worker_dead_letter_queue: str = "celery.async_worker.unsupported"
 
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / 'env_files/.env.email',
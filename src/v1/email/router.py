@@ -4,27 +4,31 @@ from fastapi import APIRouter, Depends
 from redis.asyncio import Redis
 
 from .schemas import EmailPasswordSchema, EmailSchema
-from src.database import AsyncSessionDep
+from src.replicas import ReadAsyncSessionDep
 from .utils import generate_verification_code, get_redis_pool, generate_password
-from .config import email_settings
+from .codes import reset_password_key_store, verification_code_store
 from src.exceptions import invalid_password_exception, user_not_found_exception, too_many_requests_exception
-from src.v1.jwt.utils import validate_password
-from src.v1.email.tasks import send_email_reset_password, send_email_verification_code
+from src.v1.jwt.utils import validate_password_async
+from src.v1.email.tasks import send_email_reset_password_async, send_email_verification_code_async
 from src.utils import select_user
+from src.responses import PreEncodedJSONResponse, pre_encode
 
 
 router = APIRouter()
 
+# Неизменные тела ответов кодируются один раз
+VERIFICATION_CODE_MESSAGE = pre_encode({"message": "Сообщение с кодом верификации успешно отправлено."})
+RESET_PASSWORD_MESSAGE = pre_encode({"message": "Сообщение для сброса пароля успешно отправлено."})
+
 
 @router.post("/verification-code")
 async def verification_code(
-        session: AsyncSessionDep,
+        session: ReadAsyncSessionDep,
         user_data: EmailPasswordSchema,
         redis_pool: Redis = Depends(get_redis_pool),
 ) -> JSONResponse:
-    verification_code_redis_key = f"{email_settings.verification_code_name}:{user_data.email}"
-    # Проверка на наличие почты в redis с целью получения кода
-    if await redis_pool.get(verification_code_redis_key):
+    # Повторная отправка до окончания паузы отклоняется без запроса в базу данных и проверки пароля
+    if await verification_code_store.cooldown(redis=redis_pool, email=str(user_data.email)):
         raise too_many_requests_exception
     # Поиск пользователя в базе данных по почте
     user = await select_user(session=session, email=user_data.email, get_password=True)
@@ -32,27 +36,27 @@ async def verification_code(
 
     if user:
         # Проверка пароля пользователя
-        if not validate_password(password=user_data.password, hashed_password=user.password):
+        if not await validate_password_async(password=user_data.password, hashed_password=user.password):
             raise invalid_password_exception
     # Генерация кода верификации
     email_code = generate_verification_code()
+    # Сохранение кода в redis, если с прошлой отправки прошло достаточно времени
+    if await verification_code_store.issue(redis=redis_pool, email=str(user_data.email), code=email_code):
+        raise too_many_requests_exception
     # Вызов функции для отправки сообщения по почте с верификационным кодом
-    send_email_verification_code.delay(receiver_email=str(user_data.email), code=email_code)
-    # Установка почты и верификационного кода в redis
-    await redis_pool.set(verification_code_redis_key, email_code, ex=email_settings.expire_time)
+    await send_email_verification_code_async(redis_pool=redis_pool, receiver_email=str(user_data.email), code=email_code)
 
-    return JSONResponse(status_code=status.HTTP_200_OK, content={"message": "Сообщение с кодом верификации успешно отправлено."})
+    return PreEncodedJSONResponse(status_code=status.HTTP_200_OK, content=VERIFICATION_CODE_MESSAGE)
 
 
 @router.post('/reset-password')
 async def reset_password(
-        session: AsyncSessionDep,
+        session: ReadAsyncSessionDep,
         user_data: EmailSchema,
         redis_pool: Redis = Depends(get_redis_pool),
 ) -> JSONResponse:
-    reset_password_redis_key = f"{email_settings.reset_password_name}:{user_data.email}"
-    # Проверка на наличие почты в redis с целью сбросить пароль
-    if await redis_pool.get(reset_password_redis_key):
+    # Повторная отправка до окончания паузы отклоняется без запроса в базу данных
+    if await reset_password_key_store.cooldown(redis=redis_pool, email=str(user_data.email)):
         raise too_many_requests_exception
     # Поиск пользователя в базе данных по почте
     user = await select_user(session=session, email=user_data.email)
@@ -61,9 +65,10 @@ async def reset_password(
         raise user_not_found_exception
     # Генерация ключа для сброса пароля
     email_reset_password_key = generate_password()
+    # Сохранение ключа в redis, если с прошлой отправки прошло достаточно времени
+    if await reset_password_key_store.issue(redis=redis_pool, email=str(user_data.email), code=email_reset_password_key):
+        raise too_many_requests_exception
     # Вызов функции для отправки сообщения по почте с ключом сброса пароля
-    send_email_reset_password.delay(receiver_email=str(user_data.email), key=email_reset_password_key)
-    # Установка почты и ключа сброса пароля в redis
-    await redis_pool.set(reset_password_redis_key, email_reset_password_key, ex=email_settings.expire_time)
+    await send_email_reset_password_async(redis_pool=redis_pool, receiver_email=str(user_data.email), key=email_reset_password_key)
 
-    return JSONResponse(status_code=status.HTTP_200_OK, content={"message": "Сообщение для сброса пароля успешно отправлено."})
\ No newline at end of file
+    return PreEncodedJSONResponse(status_code=status.HTTP_200_OK, content=RESET_PASSWORD_MESSAGE)
\ No newline at end of file
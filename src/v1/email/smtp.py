@@ -0,0 +1,253 @@
+import asyncio
+import os
+import smtplib
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Sequence
+
+import aiosmtplib
+
+from src.container import logger
+from src.v1.email.config import email_settings
+
+
+class SMTPConnection:
+    def __init__(self, smtp: smtplib.SMTP) -> None:
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.messages_sent = 0
+
+    def close(self) -> None:
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+# Пул авторизованных SMTP сессий процесса воркера: STARTTLS и логин выполняются один раз на соединение
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        size: int,
+        max_messages_per_connection: int,
+        max_connection_age: float,
+        timeout: float,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_connection_age = max_connection_age
+        self.timeout = timeout
+        self._idle: list[SMTPConnection] = []
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._pid = os.getpid()
+
+    def _connect(self) -> SMTPConnection:
+        smtp = smtplib.SMTP(host=self.host, port=self.port, timeout=self.timeout)
+        try:
+            smtp.starttls()
+            smtp.login(user=self.user, password=self.password)
+        except Exception:
+            smtp.close()
+            raise
+        logger.info(f"Открыто новое SMTP соединение с {self.host}:{self.port}")
+        return SMTPConnection(smtp=smtp)
+
+    def _is_expired(self, connection: SMTPConnection) -> bool:
+        return (
+            connection.messages_sent >= self.max_messages_per_connection
+            or time.monotonic() - connection.created_at >= self.max_connection_age
+        )
+
+    @staticmethod
+    def _is_alive(connection: SMTPConnection) -> bool:
+        try:
+            return connection.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _reset_after_fork(self) -> None:
+        # Соединения родительского процесса нельзя использовать в дочернем после fork
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self._lock = threading.Lock()
+            self._semaphore = threading.BoundedSemaphore(self.size)
+
+    def _take_idle(self) -> SMTPConnection | None:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            if not self._is_expired(connection) and self._is_alive(connection):
+                return connection
+            connection.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[SMTPConnection]:
+        self._reset_after_fork()
+        with self._semaphore:
+            connection = self._take_idle() or self._connect()
+            try:
+                yield connection
+            except smtplib.SMTPResponseException:
+                # Сервер ответил ошибкой на конкретное письмо, сама сессия остается рабочей
+                self._release(connection)
+                raise
+            except Exception:
+                connection.close()
+                raise
+            else:
+                self._release(connection)
+
+    def _release(self, connection: SMTPConnection) -> None:
+        if self._is_expired(connection):
+            connection.close()
+            return
+        with self._lock:
+            self._idle.append(connection)
+
+    def sendmail(self, from_addr: str, to_addrs: str | Sequence[str], msg: str) -> None:
+        try:
+            with self.connection() as connection:
+                connection.messages_sent += 1
+                connection.smtp.sendmail(from_addr, to_addrs, msg)
+        except smtplib.SMTPServerDisconnected:
+            # Сервер мог закрыть соединение между NOOP и отправкой, повторяем один раз на новом
+            with self.connection() as connection:
+                connection.messages_sent += 1
+                connection.smtp.sendmail(from_addr, to_addrs, msg)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class AsyncSMTPConnection:
+    def __init__(self, smtp: aiosmtplib.SMTP) -> None:
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.messages_sent = 0
+
+    async def close(self) -> None:
+        try:
+            await self.smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+# Асинхронный аналог пула SMTP сессий для asyncio воркера
+class AsyncSMTPConnectionPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        size: int,
+        max_messages_per_connection: int,
+        max_connection_age: float,
+        timeout: float,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_connection_age = max_connection_age
+        self.timeout = timeout
+        self._idle: list[AsyncSMTPConnection] = []
+        self._semaphore = asyncio.BoundedSemaphore(size)
+
+    async def _connect(self) -> AsyncSMTPConnection:
+        smtp = aiosmtplib.SMTP(hostname=self.host, port=self.port, timeout=self.timeout, start_tls=True)
+        await smtp.connect()
+        try:
+            await smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        logger.info(f"Открыто новое асинхронное SMTP соединение с {self.host}:{self.port}")
+        return AsyncSMTPConnection(smtp=smtp)
+
+    def _is_expired(self, connection: AsyncSMTPConnection) -> bool:
+        return (
+            connection.messages_sent >= self.max_messages_per_connection
+            or time.monotonic() - connection.created_at >= self.max_connection_age
+        )
+
+    @staticmethod
+    async def _is_alive(connection: AsyncSMTPConnection) -> bool:
+        try:
+            return (await connection.smtp.noop()).code == 250
+        except (aiosmtplib.SMTPException, OSError):
+            return False
+
+    async def _take_idle(self) -> AsyncSMTPConnection | None:
+        while self._idle:
+            connection = self._idle.pop()
+            if not self._is_expired(connection) and await self._is_alive(connection):
+                return connection
+            await connection.close()
+        return None
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncSMTPConnection]:
+        async with self._semaphore:
+            connection = await self._take_idle() or await self._connect()
+            try:
+                yield connection
+            except aiosmtplib.SMTPResponseException:
+                await self._release(connection)
+                raise
+            except BaseException:
+                connection.smtp.close()
+                raise
+            else:
+                await self._release(connection)
+
+    async def _release(self, connection: AsyncSMTPConnection) -> None:
+        if self._is_expired(connection):
+            await connection.close()
+            return
+        self._idle.append(connection)
+
+    async def sendmail(self, from_addr: str, to_addrs: str | Sequence[str], msg: str) -> None:
+        try:
+            async with self.connection() as connection:
+                connection.messages_sent += 1
+                await connection.smtp.sendmail(from_addr, to_addrs, msg)
+        except aiosmtplib.SMTPServerDisconnected:
+            async with self.connection() as connection:
+                connection.messages_sent += 1
+                await connection.smtp.sendmail(from_addr, to_addrs, msg)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+
+
+smtp_connection_pool = SMTPConnectionPool(
+    host=email_settings.smtp_host,
+    port=email_settings.smtp_port,
+    user=email_settings.EMAIL_NAME,
+    password=email_settings.EMAIL_APP_PASSWORD,
+    size=email_settings.smtp_pool_size,
+    max_messages_per_connection=email_settings.smtp_max_messages_per_connection,
+    max_connection_age=email_settings.smtp_max_connection_age.total_seconds(),
+    timeout=email_settings.smtp_timeout,
+)
@@ -1,3 +1,6 @@
+import asyncio
+import json
+import math
 import smtplib
 from email import encoders
 from email.mime.base import MIMEBase
@@ -5,32 +8,81 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from typing import Optional
 
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+
+from src.config import tasks_settings
 from src.container import logger
 from src.worker import app
 from src.v1.email.config import email_settings
+from src.v1.email.smtp import smtp_connection_pool
+from src.v1.email.templates import get_email_template
+
+
+# Клиент redis воркера для чтения очереди пакетной отправки
+batch_redis: SyncRedis | None = None
+
+
+def get_batch_redis() -> SyncRedis:
+    global batch_redis
+    if batch_redis is None:
+        batch_redis = SyncRedis.from_url(tasks_settings.REDIS_URL, decode_responses=True)
+    return batch_redis
+
+
+def reset_password_email(key: str) -> dict[str, str]:
+    return {
+        "subject": "Сброс пароля",
+        "body": f"Ваш ключ для сброса пароля: {key}",
+        "html": get_email_template(name="reset_password.html", variable="key").render(key),
+    }
+
+
+def verification_code_email(code: str) -> dict[str, str]:
+    return {
+        "subject": "Код авторизации",
+        "body": f"Ваш код подтверждения: {code}",
+        "html": get_email_template(name="verification_code.html", variable="code").render(code),
+    }
+
+
+@worker_process_init.connect
+def compile_email_templates(**kwargs) -> None:
+    # Шаблоны компилируются один раз при старте процесса воркера, а не при первой отправке
+    get_email_template(name="reset_password.html", variable="key")
+    get_email_template(name="verification_code.html", variable="code")
 
 
 @app.task
 def send_email_reset_password(receiver_email: str, key: str) -> None:
-    subject = "Сброс пароля"
-    body = f"Ваш ключ для сброса пароля: {key}"
-    send_email(receiver_email=receiver_email, subject=subject, body=body)
+    send_email(receiver_email=receiver_email, **reset_password_email(key=key))
 
 
 @app.task
 def send_email_verification_code(receiver_email: str, code: str) -> None:
-    subject = "Код авторизации"
-    body = f"Ваш код подтверждения: {code}"
-    send_email(receiver_email=receiver_email, subject=subject, body=body)
+    send_email(receiver_email=receiver_email, **verification_code_email(code=code))
 
 
-@app.task
-def send_email(receiver_email: str, subject: str, body: str, attachment_path: Optional[str] = None) -> None:
+def create_email_message(
+    receiver_email: str,
+    subject: str,
+    body: str,
+    attachment_path: Optional[str] = None,
+    html: Optional[str] = None,
+) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg["From"] = email_settings.EMAIL_NAME
     msg["To"] = receiver_email
     msg["Subject"] = subject
-    msg.attach(MIMEText(_text=body, _subtype="plain"))
+    if html:
+        # Текстовая и HTML версии письма, почтовый клиент выбирает подходящую
+        alternative = MIMEMultipart("alternative")
+        alternative.attach(MIMEText(_text=body, _subtype="plain"))
+        alternative.attach(MIMEText(_text=html, _subtype="html"))
+        msg.attach(alternative)
+    else:
+        msg.attach(MIMEText(_text=body, _subtype="plain"))
 
     try:
         if attachment_path:
@@ -46,18 +98,112 @@ def send_email(receiver_email: str, subject: str, body: str, attachment_path: Op
     except:
         logger.error(f"Произошла ошибка в момент закрепления вложения в письмо на почту {receiver_email}")
 
-    try:
-        server = smtplib.SMTP(host="smtp.gmail.com", port=587)
-        server.starttls()  # Secure the connection
-        server.login(user=email_settings.EMAIL_NAME, password=email_settings.EMAIL_APP_PASSWORD)  # Log in to your email account
+    return msg
+
+
+@app.task
+def send_email(
+    receiver_email: str,
+    subject: str,
+    body: str,
+    attachment_path: Optional[str] = None,
+    html: Optional[str] = None,
+) -> None:
+    msg = create_email_message(
+        receiver_email=receiver_email, subject=subject, body=body, attachment_path=attachment_path, html=html
+    )
 
-        # Send the email
+    try:
+        # Отправка через уже авторизованную сессию из пула процесса воркера
         text = msg.as_string()  # Convert the message to a string
-        server.sendmail(email_settings.EMAIL_NAME, receiver_email, text)
+        smtp_connection_pool.sendmail(email_settings.EMAIL_NAME, receiver_email, text)
         logger.info(f"Успешно было отправлено сообщение на почту {receiver_email}")
         return True
     except Exception as e:
         logger.error(f"Произошла ошибка отправки сообщения на почту {receiver_email}:\n{e}")
         return False
-    finally:
-        server.quit()  # Close the connection
+
+
+async def enqueue_email(redis_pool: Redis, receiver_email: str, subject: str, body: str, html: Optional[str] = None) -> None:
+    # Письмо кладется в общую очередь redis, задача отправки ставится, пока нет метки уже поставленной задачи.
+    # Метка истекает сама, поэтому письма не застрянут в redis, даже если задача потеряется
+    length = await redis_pool.rpush(
+        email_settings.batch_redis_key,
+        json.dumps({"receiver_email": receiver_email, "subject": subject, "body": body, "html": html}),
+    )
+    max_delay = email_settings.batch_max_delay.total_seconds()
+    if await redis_pool.set(email_settings.batch_scheduled_redis_key, 1, nx=True, px=math.ceil(max_delay * 2000)):
+        try:
+            # Публикация через celery блокирующая, поэтому выполняется вне event loop
+            await asyncio.to_thread(flush_email_batch.apply_async, countdown=max_delay)
+        except Exception:
+            await redis_pool.delete(email_settings.batch_scheduled_redis_key)
+            raise
+    elif length % email_settings.batch_size == 0:
+        await asyncio.to_thread(flush_email_batch.delay)
+
+
+async def send_email_reset_password_async(redis_pool: Redis, receiver_email: str, key: str) -> None:
+    if email_settings.batch_enabled:
+        await enqueue_email(redis_pool=redis_pool, receiver_email=receiver_email, **reset_password_email(key=key))
+    else:
+        send_email_reset_password.delay(receiver_email=receiver_email, key=key)
+
+
+async def send_email_verification_code_async(redis_pool: Redis, receiver_email: str, code: str) -> None:
+    if email_settings.batch_enabled:
+        await enqueue_email(redis_pool=redis_pool, receiver_email=receiver_email, **verification_code_email(code=code))
+    else:
+        send_email_verification_code.delay(receiver_email=receiver_email, code=code)
+
+
+def send_email_batch(messages: list[dict[str, str | None]]) -> list[dict[str, str]]:
+    results: list[dict[str, str]] = []
+    failed: list[dict[str, str | None]] = []
+    # Все письма пакета отправляются подряд в рамках одной SMTP сессии
+    with smtp_connection_pool.connection() as connection:
+        for message in messages:
+            receiver_email = message["receiver_email"]
+            text = create_email_message(**message).as_string()
+            try:
+                connection.messages_sent += 1
+                connection.smtp.sendmail(email_settings.EMAIL_NAME, receiver_email, text)
+            except (smtplib.SMTPException, OSError) as e:
+                logger.error(f"Произошла ошибка отправки сообщения на почту {receiver_email}:\n{e}")
+                results.append({"receiver_email": receiver_email, "status": "failed", "error": str(e)})
+                failed.append(message)
+            else:
+                results.append({"receiver_email": receiver_email, "status": "sent"})
+    # Неудачные письма повторяются по отдельности, не задерживая остальной пакет
+    for message in failed:
+        send_email.apply_async(kwargs=message, countdown=email_settings.batch_retry_delay.total_seconds())
+    logger.info(f"Отправлен пакет писем: {len(messages) - len(failed)} успешно, {len(failed)} с ошибкой")
+    return results
+
+
+@app.task
+def flush_email_batch() -> list[dict[str, str]]:
+    redis = get_batch_redis()
+    # Метка снимается до разбора очереди, чтобы письма, добавленные во время отправки, поставили новую задачу
+    redis.delete(email_settings.batch_scheduled_redis_key)
+    results: list[dict[str, str]] = []
+    while True:
+        items: list[str] | None = redis.lpop(email_settings.batch_redis_key, email_settings.batch_size)
+        if not items:
+            break
+        messages = [json.loads(item) for item in items]
+        try:
+            results.extend(send_email_batch(messages=messages))
+        except Exception as e:
+            # Не удалось даже открыть SMTP сессию, каждое письмо пакета повторяется отдельно
+            logger.error(f"Произошла ошибка пакетной отправки писем:\n{e}")
+            for message in messages:
+                results.append({"receiver_email": message["receiver_email"], "status": "failed", "error": str(e)})
+                send_email.apply_async(kwargs=message, countdown=email_settings.batch_retry_delay.total_seconds())
+    return results
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_smtp_connection_pool(**kwargs) -> None:
+    smtp_connection_pool.close()
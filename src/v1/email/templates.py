@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import escape
+
+from src.v1.email.config import email_settings
+
+# Значение-заглушка, по которой отрендеренный один раз шаблон делится на статические части
+PLACEHOLDER = "\x00placeholder\x00"
+
+
+@lru_cache(maxsize=1)
+def get_templates_environment() -> Environment:
+    bytecode_cache_dir = email_settings.templates_bytecode_cache_dir
+    return Environment(
+        loader=FileSystemLoader(email_settings.templates_dir),
+        autoescape=select_autoescape(["html"]),
+        bytecode_cache=FileSystemBytecodeCache(str(bytecode_cache_dir) if bytecode_cache_dir else None),
+        auto_reload=False,
+    )
+
+
+# Шаблон письма с одной переменной: статический контекст подставляется один раз,
+# а при каждой отправке в готовые части вставляется только экранированный код или ключ
+class EmailTemplate:
+    def __init__(self, name: str, variable: str, static_context: dict[str, Any]) -> None:
+        self.template = get_templates_environment().get_template(name)
+        self.variable = variable
+        self.static_context = static_context
+        self.parts: list[str] | None = self.template.render(
+            **static_context, **{variable: PLACEHOLDER}
+        ).split(PLACEHOLDER)
+        # Если переменная проходит через фильтры, заглушки в результате нет и шаблон рендерится каждый раз
+        if len(self.parts) == 1:
+            self.parts = None
+
+    def render(self, value: str) -> str:
+        if self.parts is None:
+            return self.template.render(**self.static_context, **{self.variable: value})
+        return str(escape(value)).join(self.parts)
+
+
+@lru_cache(maxsize=None)
+def get_email_template(name: str, variable: str) -> EmailTemplate:
+    return EmailTemplate(
+        name=name,
+        variable=variable,
+        static_context={"expire_minutes": int(email_settings.expire_time.total_seconds() // 60)},
+    )
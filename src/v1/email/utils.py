@@ -1,9 +1,9 @@
 from random import choice
 from string import digits, ascii_letters
-from redis.asyncio import from_url, Redis
+from redis.asyncio import Redis
 from typing import AsyncIterator, LiteralString
 
-from src.config import tasks_settings
+from src.redis_pool import get_redis_client
 
 
 def generate_password(
@@ -22,10 +22,8 @@ def generate_verification_code(symbols: LiteralString = digits, length: int = 6)
 
 
 async def get_redis_pool() -> AsyncIterator[Redis]:
-    redis: Redis = await from_url(
-        f"redis://{tasks_settings.REDIS_HOST}:{tasks_settings.REDIS_PORT}",
-        decode_responses=True
-    )
+    # Клиент берет соединения из общего пула и не закрывает его при выходе
+    redis: Redis = get_redis_client()
     try:
         yield redis
     finally:
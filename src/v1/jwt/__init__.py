@@ -1,7 +1,7 @@
-__all__ = ("router", )
+__all__ = ("router", "jwks_router")
 
 
-from .router import router as views_router
+from .router import router as views_router, jwks_router
 from fastapi import APIRouter
 
 
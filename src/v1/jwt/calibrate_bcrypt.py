@@ -0,0 +1,58 @@
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+from src.v1.jwt.config import password_settings
+
+# Подбор стоимости bcrypt под текущий сервер: выбирается наибольшая стоимость,
+# при которой медианное время одного хэша не превышает заданное.
+#
+# Запуск: python -m src.v1.jwt.calibrate_bcrypt --target-ms 250
+# Результат задается переменной окружения PASSWORD_bcrypt_rounds.
+
+PASSWORD = b"calibration-password"
+MIN_ROUNDS = 4
+MAX_ROUNDS = 20
+
+
+def measure_hash_ms(rounds: int, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(PASSWORD, bcrypt.gensalt(rounds=rounds))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int) -> tuple[int, dict[int, float]]:
+    timings: dict[int, float] = {}
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        timings[rounds] = measure_hash_ms(rounds=rounds, samples=samples)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Подбор стоимости bcrypt под целевое время хэширования")
+    parser.add_argument("--target-ms", type=float, default=250, help="целевое время одного хэша в миллисекундах")
+    parser.add_argument("--samples", type=int, default=3, help="замеров на каждую стоимость, берется медиана")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    chosen, timings = calibrate(target_ms=args.target_ms, samples=args.samples)
+    for rounds, elapsed in timings.items():
+        marker = " <- выбрано" if rounds == chosen else ""
+        current = " (текущее значение)" if rounds == password_settings.bcrypt_rounds else ""
+        print(f"cost={rounds:>2} {elapsed:>10.1f} ms{current}{marker}")
+    print(f"PASSWORD_bcrypt_rounds={chosen}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ from datetime import timedelta
 from pathlib import Path
 from typing import Literal
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from src.container import BASE_DIR
@@ -10,16 +11,47 @@ from src.container import BASE_DIR
 class JWTSettings(BaseSettings):
     private_key_path: Path = BASE_DIR / "certs" / "jwt-private.pem"
     public_key_path: Path = BASE_DIR / "certs" / "jwt-public.pem"
-    algorithm: str = 'RS256'
+    # Публичные ключи, которые еще принимаются при проверке во время ротации
+    extra_public_key_paths: list[Path] = []
+    jwks_max_age: int = 3600
     access_token_expire_minutes: timedelta = timedelta(minutes=15)
     refresh_token_expire_days: timedelta = timedelta(days=7)
     access_token_type: str = "Bearer"
     jwt_access_token_type: str = "access"
     jwt_refresh_token_type: str = "refresh"
+    verified_token_cache_size: int = 10_000
 
     model_config = SettingsConfigDict(case_sensitive=True)
 
 
+class CryptoExecutorSettings(BaseSettings):
+    max_workers: int = 4
+    max_pending: int = 64
+    retry_after_seconds: int = 1
+
+    model_config = SettingsConfigDict(case_sensitive=True, env_prefix="CRYPTO_EXECUTOR_")
+
+
+class PasswordSettings(BaseSettings):
+    # Стоимость bcrypt, подобрать под сервер: python -m src.v1.jwt.calibrate_bcrypt
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31)
+    # Перехешировать пароль при входе, если стоимость сохраненного хэша отличается от bcrypt_rounds
+    rehash_on_login: bool = True
+
+    model_config = SettingsConfigDict(case_sensitive=True, env_prefix="PASSWORD_")
+
+
+class RevocationSettings(BaseSettings):
+    enabled: bool = True
+    redis_prefix: str = "revoked"
+    # Пауза перед повторной подпиской на события отзыва после ошибки redis
+    reconnect_delay: float = 1.0
+    # Как часто из памяти удаляются записи об уже истекших токенах
+    prune_interval: float = 60.0
+
+    model_config = SettingsConfigDict(case_sensitive=True, env_prefix="TOKEN_REVOCATION_")
+
+
 class CookiesSettings(BaseSettings):
     refresh_token_name: str = "refresh_token"
     httponly: bool = True
@@ -30,4 +62,7 @@ class CookiesSettings(BaseSettings):
 
 
 jwt_settings = JWTSettings()
+crypto_executor_settings = CryptoExecutorSettings()
+password_settings = PasswordSettings()
+revocation_settings = RevocationSettings()
 cookies_settings = CookiesSettings()
@@ -7,14 +7,16 @@ from src.exceptions import (
     user_not_found_exception, user_is_not_admin_exception, user_is_not_stuff_exception
 )
 from .exceptions import invalid_access_token_exception, invalid_refresh_token_exception, \
-    refresh_token_not_found_exception, expired_token_exception
+    refresh_token_not_found_exception, expired_token_exception, revoked_token_exception
+from .revocation import token_revocation_list
 from .utils import decode_jwt
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
 from src.schemas import UserSchema
-from src.database import AsyncSessionDep
+from src.replicas import ReadAsyncSessionDep
 from typing import Annotated, Any
 from .config import jwt_settings
 from src.utils import select_user
+from src.cache import user_cache
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl="/src/v1/jwt/login")
 
@@ -29,6 +31,9 @@ def get_current_access_token_payload(
         raise expired_token_exception
     except InvalidTokenError:
         raise invalid_access_token_exception
+    # Проверка по списку в памяти процесса, без обращения к redis
+    if token_revocation_list.is_revoked(payload):
+        raise revoked_token_exception
     return payload
 
 
@@ -41,6 +46,8 @@ def get_current_refresh_token_payload(refresh_token: Annotated[str | None, Cooki
         raise expired_token_exception
     except InvalidTokenError:
         raise invalid_refresh_token_exception
+    if token_revocation_list.is_revoked(payload):
+        raise revoked_token_exception
     return payload
 
 
@@ -79,24 +86,30 @@ def validate_token_stuff(
 
 
 async def get_user_by_token_uid(
-    session: AsyncSessionDep,
+    session: ReadAsyncSessionDep,
     payload: dict[str, Any]
 ) -> UserSchema:
     from src.container import logger
     user_id = int(payload.get("uid"))
     logger.info(f"user_id = {user_id}")
+    user = await user_cache.get(user_id)
+    if user is not None:
+        return user
+
     user = await select_user(session=session, id=user_id)
 
     if not user:
         raise user_not_found_exception
 
+    await user_cache.set(user)
+
     return user
 
 
 class UserGetterFromAccessToken:
     async def __call__(
         self,
-        session: AsyncSessionDep,
+        session: ReadAsyncSessionDep,
         payload: dict[str, Any] = Depends(get_current_access_token_payload)
     ) -> UserSchema:
         validate_token_type(payload=payload, token_type=jwt_settings.jwt_access_token_type)
@@ -106,7 +119,7 @@ class UserGetterFromAccessToken:
 class UserGetterFromRefreshToken:
     async def __call__(
         self,
-        session: AsyncSessionDep,
+        session: ReadAsyncSessionDep,
         payload: dict[str, Any] = Depends(get_current_refresh_token_payload)
     ) -> UserSchema:
         validate_token_type(payload=payload, token_type=jwt_settings.jwt_refresh_token_type)
@@ -116,7 +129,7 @@ class UserGetterFromRefreshToken:
 class AdminUserGetterFromAccessToken:
     async def __call__(
             self,
-            session: AsyncSessionDep,
+            session: ReadAsyncSessionDep,
             payload: dict[str, Any] = Depends(get_current_access_token_payload)
     ) -> UserSchema:
         validate_token_type(payload=payload, token_type=jwt_settings.jwt_access_token_type)
@@ -127,7 +140,7 @@ class AdminUserGetterFromAccessToken:
 class StuffUserGetterFromAccessToken:
     async def __call__(
             self,
-            session: AsyncSessionDep,
+            session: ReadAsyncSessionDep,
             payload: dict[str, Any] = Depends(get_current_access_token_payload)
     ) -> UserSchema:
         validate_token_type(payload=payload, token_type=jwt_settings.jwt_access_token_type)
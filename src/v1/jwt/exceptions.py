@@ -1,6 +1,8 @@
 from fastapi import HTTPException
 from starlette import status
 
+from .config import crypto_executor_settings
+
 invalid_access_token_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail=f"Неверный access токен!",
@@ -17,3 +19,12 @@ expired_token_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail=f"Просроченный токен!"
 )
+revoked_token_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Токен отозван!"
+)
+crypto_executor_overloaded_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Сервер перегружен. Попробуйте позже!",
+    headers={"Retry-After": str(crypto_executor_settings.retry_after_seconds)},
+)
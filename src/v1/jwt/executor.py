@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from src.metrics import crypto_duration_seconds, metrics_registry
+from .config import crypto_executor_settings
+from .exceptions import crypto_executor_overloaded_exception
+
+T = TypeVar("T")
+
+
+# Ограниченный пул потоков для bcrypt и подписи JWT вне event loop
+class CryptoExecutor:
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="crypto",
+            )
+        return self._executor
+
+    def _call(self, func: functools.partial[T]) -> T:
+        with self._lock:
+            self._active += 1
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            crypto_duration_seconds.observe((func.func.__name__,), time.perf_counter() - started)
+            with self._lock:
+                self._active -= 1
+
+    async def run(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        # Задачи сверх лимита очереди сразу отклоняются, а не копятся в памяти
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise crypto_executor_overloaded_exception
+        self._pending += 1
+        self._submitted += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), self._call, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "active": self._active,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+crypto_executor = CryptoExecutor(
+    max_workers=crypto_executor_settings.max_workers,
+    max_pending=crypto_executor_settings.max_pending,
+)
+metrics_registry.gauge_collector(
+    "crypto_executor",
+    "Состояние пула потоков для bcrypt и подписи JWT",
+    lambda: [({"stat": stat}, value) for stat, value in crypto_executor.stats().items()],
+)
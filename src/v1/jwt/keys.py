@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes, PublicKeyTypes
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+
+from .config import jwt_settings
+
+# Обязательные поля JWK для вычисления отпечатка по RFC 7638
+THUMBPRINT_MEMBERS: dict[str, tuple[str, ...]] = {
+    "RSA": ("e", "kty", "n"),
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+}
+
+
+@dataclass(frozen=True)
+class JWTKey:
+    kid: str
+    algorithm: str
+    public_key: PublicKeyTypes
+    jwk: dict[str, Any]
+    private_key: PrivateKeyTypes | None = None
+
+
+def get_key_algorithm(public_key: PublicKeyTypes) -> str:
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1):
+        return "ES256"
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return "EdDSA"
+    raise ValueError(f"Неподдерживаемый тип ключа для JWT: {type(public_key).__name__}")
+
+
+def public_key_to_jwk(public_key: PublicKeyTypes) -> dict[str, Any]:
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return RSAAlgorithm.to_jwk(public_key, as_dict=True)
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return ECAlgorithm.to_jwk(public_key, as_dict=True)
+    return OKPAlgorithm.to_jwk(public_key, as_dict=True)
+
+
+def get_jwk_thumbprint(jwk: dict[str, Any]) -> str:
+    members = {name: jwk[name] for name in THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def create_jwt_key(public_key: PublicKeyTypes, private_key: PrivateKeyTypes | None = None) -> JWTKey:
+    algorithm = get_key_algorithm(public_key)
+    jwk = public_key_to_jwk(public_key)
+    kid = get_jwk_thumbprint(jwk)
+    jwk.update(kid=kid, alg=algorithm, use="sig")
+    return JWTKey(kid=kid, algorithm=algorithm, public_key=public_key, jwk=jwk, private_key=private_key)
+
+
+# Связка ключей: один ключ для подписи и все ключи, которые еще принимаются при проверке
+class JWTKeyRing:
+    def __init__(self, signing_key: JWTKey, verification_keys: list[JWTKey]) -> None:
+        self.signing_key = signing_key
+        self.verification_keys: dict[str, JWTKey] = {signing_key.kid: signing_key}
+        for key in verification_keys:
+            self.verification_keys.setdefault(key.kid, key)
+        self.jwks: bytes = json.dumps(
+            {"keys": [key.jwk for key in self.verification_keys.values()]},
+            separators=(",", ":"),
+        ).encode()
+
+    def get_verification_key(self, kid: str | None) -> JWTKey | None:
+        # Токены без kid выпущены до появления связки ключей и подписаны основным ключом
+        if kid is None:
+            return self.signing_key
+        return self.verification_keys.get(kid)
+
+    @classmethod
+    def from_files(cls, private_key_path: Path, public_key_paths: list[Path]) -> "JWTKeyRing":
+        private_key = load_pem_private_key(private_key_path.read_bytes(), password=None)
+        signing_key = create_jwt_key(public_key=private_key.public_key(), private_key=private_key)
+        verification_keys = [
+            create_jwt_key(public_key=load_pem_public_key(path.read_bytes()))
+            for path in public_key_paths
+            if path.exists()
+        ]
+        return cls(signing_key=signing_key, verification_keys=verification_keys)
+
+
+jwt_key_ring = JWTKeyRing.from_files(
+    private_key_path=jwt_settings.private_key_path,
+    public_key_paths=[jwt_settings.public_key_path, *jwt_settings.extra_public_key_paths],
+)
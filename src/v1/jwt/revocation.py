@@ -0,0 +1,169 @@
+import asyncio
+import time
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.container import logger
+from src.metrics import metrics_registry
+from src.redis_pool import get_redis_client
+from .config import jwt_settings, revocation_settings
+
+# Отзыв токенов до истечения срока. В redis хранятся отозванные jti (zset jti -> exp) и время,
+# раньше которого выданные пользователю токены недействительны (hash uid -> epoch).
+# Каждый процесс держит копию в памяти и получает изменения через pub/sub,
+# поэтому проверка токена в запросе не обращается к redis.
+
+
+class TokenRevocationList:
+    def __init__(self, prefix: str, reconnect_delay: float, prune_interval: float, max_token_lifetime: float) -> None:
+        self.jti_key = f"{prefix}:jti"
+        self.users_key = f"{prefix}:users"
+        self.channel = f"{prefix}:events"
+        self.reconnect_delay = reconnect_delay
+        self.prune_interval = prune_interval
+        # Запись "не раньше" старше срока жизни refresh токена уже ничего не отзывает
+        self.max_token_lifetime = max_token_lifetime
+        self.revoked_jtis: dict[str, float] = {}
+        self.not_before: dict[int, int] = {}
+        self.is_synced = False
+        self.pruned_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _redis() -> Redis:
+        return get_redis_client()
+
+    def is_revoked(self, payload: dict[str, Any]) -> bool:
+        if payload.get("jti") in self.revoked_jtis:
+            return True
+        not_before = self.not_before.get(payload.get("uid"))
+        return not_before is not None and int(payload.get("iat", 0)) < not_before
+
+    async def revoke_token(self, payload: dict[str, Any]) -> None:
+        jti = payload.get("jti")
+        expire = float(payload.get("exp", 0))
+        now = time.time()
+        # Токены без jti выданы до появления отзыва и отзываются только через revoke_user
+        if jti is None or expire <= now:
+            return
+        async with self._redis().pipeline(transaction=True) as pipe:
+            pipe.zadd(self.jti_key, {jti: expire})
+            pipe.zremrangebyscore(self.jti_key, "-inf", now)
+            pipe.publish(self.channel, f"jti:{expire}:{jti}")
+            await pipe.execute()
+        self.revoked_jtis[jti] = expire
+
+    async def revoke_user(self, user_id: int) -> None:
+        # Отзываются все токены пользователя, выданные до конца этой секунды: iat хранится с точностью до секунды,
+        # поэтому токен из той же секунды иначе остался бы действительным
+        not_before = int(time.time()) + 1
+        async with self._redis().pipeline(transaction=True) as pipe:
+            pipe.hset(self.users_key, str(user_id), not_before)
+            pipe.publish(self.channel, f"user:{not_before}:{user_id}")
+            await pipe.execute()
+        self.not_before[user_id] = max(self.not_before.get(user_id, 0), not_before)
+
+    def apply_event(self, event: str) -> None:
+        kind, value, subject = event.split(":", 2)
+        if kind == "jti":
+            if float(value) > time.time():
+                self.revoked_jtis[subject] = float(value)
+        elif kind == "user":
+            user_id = int(subject)
+            self.not_before[user_id] = max(self.not_before.get(user_id, 0), int(value))
+
+    async def load(self, redis: Redis) -> None:
+        now = time.time()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.jti_key, "-inf", now)
+            pipe.zrange(self.jti_key, 0, -1, withscores=True)
+            pipe.hgetall(self.users_key)
+            _, revoked_jtis, not_before = await pipe.execute()
+        self.revoked_jtis = {jti: float(expire) for jti, expire in revoked_jtis}
+        self.not_before = {}
+        expired_users = []
+        for user_id, value in not_before.items():
+            if int(value) < now - self.max_token_lifetime:
+                expired_users.append(user_id)
+            else:
+                self.not_before[int(user_id)] = int(value)
+        if expired_users:
+            await redis.hdel(self.users_key, *expired_users)
+        self.pruned_at = now
+
+    def prune(self) -> None:
+        now = time.time()
+        self.revoked_jtis = {jti: expire for jti, expire in self.revoked_jtis.items() if expire > now}
+        self.not_before = {
+            user_id: value for user_id, value in self.not_before.items() if value >= now - self.max_token_lifetime
+        }
+        self.pruned_at = now
+
+    async def start(self) -> None:
+        if not revocation_settings.enabled or self._task is not None:
+            return
+        # Список загружается до приема запросов, дальше изменения приходят через pub/sub
+        try:
+            await self.load(self._redis())
+        except RedisError as e:
+            logger.warning(f"Не удалось загрузить список отозванных токенов: {e!r}")
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.is_synced = False
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.listen()
+            except RedisError as e:
+                # Пока подписка не восстановлена, проверяется последний известный список
+                self.is_synced = False
+                logger.warning(f"Потеряна подписка на события отзыва токенов: {e!r}")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def listen(self) -> None:
+        redis = self._redis()
+        async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+            # Подписка оформляется до загрузки списка, чтобы не пропустить события между ними
+            await pubsub.subscribe(self.channel)
+            await self.load(redis)
+            self.is_synced = True
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    try:
+                        self.apply_event(message["data"])
+                    except ValueError:
+                        logger.warning(f"Некорректное событие отзыва токена: {message['data']!r}")
+                if time.time() - self.pruned_at >= self.prune_interval:
+                    self.prune()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "revoked_jtis": len(self.revoked_jtis),
+            "revoked_users": len(self.not_before),
+            "synced": int(self.is_synced),
+        }
+
+
+token_revocation_list = TokenRevocationList(
+    prefix=revocation_settings.redis_prefix,
+    reconnect_delay=revocation_settings.reconnect_delay,
+    prune_interval=revocation_settings.prune_interval,
+    max_token_lifetime=jwt_settings.refresh_token_expire_days.total_seconds(),
+)
+metrics_registry.gauge_collector(
+    "token_revocation",
+    "Размер списка отозванных токенов в памяти процесса",
+    lambda: [({"stat": stat}, value) for stat, value in token_revocation_list.stats().items()],
+)
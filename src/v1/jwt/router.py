@@ -1,25 +1,86 @@
-from fastapi import APIRouter, Depends
-from starlette.responses import JSONResponse
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Header
+from jwt.exceptions import InvalidTokenError
+from starlette.responses import JSONResponse, Response
 from starlette import status
 
+from src.responses import PreEncodedJSONResponse, pre_encode
 from src.schemas import UserSchema
-from .dependencies import get_current_user_with_refresh_token
-from .utils import set_tokens_in_response
+from .config import cookies_settings, jwt_settings
+from .dependencies import get_current_refresh_token_payload, get_current_user_with_refresh_token, validate_token_type
+from .keys import jwt_key_ring
+from .revocation import token_revocation_list
+from .utils import decode_jwt_async, set_tokens_in_response_async
 
 router = APIRouter()
+jwks_router = APIRouter(tags=["JWT"])
+
+# Неизменное тело ответа кодируется один раз
+REFRESH_MESSAGE = pre_encode({"message": "Токены успешно обновлены."})
+LOGOUT_MESSAGE = pre_encode({"message": "Токены успешно отозваны."})
 
 
 @router.post('/refresh', response_model=UserSchema)
-def refresh(
+async def refresh(
     user: UserSchema = Depends(get_current_user_with_refresh_token)
 ) -> JSONResponse:
 
-    response: JSONResponse = JSONResponse(
-        content={"message": "Токены успешно обновлены."},
+    response: JSONResponse = PreEncodedJSONResponse(
+        content=REFRESH_MESSAGE,
         status_code=status.HTTP_200_OK
     )
 
-    return set_tokens_in_response(response=response, user=user)
+    return await set_tokens_in_response_async(response=response, user=user)
+
+
+@router.post('/logout')
+async def logout(
+    payload: dict[str, Any] = Depends(get_current_refresh_token_payload),
+    authorization: Annotated[str | None, Header()] = None,
+) -> JSONResponse:
+    validate_token_type(payload=payload, token_type=jwt_settings.jwt_refresh_token_type)
+    # Access токен из заголовка, если он передан, отзывается вместе с refresh токеном.
+    # Только токен того же пользователя: чужой access токен так отозвать нельзя.
+    # Проверка подписи в пуле потоков выполняется до отзыва: при перегрузке пула (503) выход можно повторить
+    access_payload = None
+    if authorization:
+        try:
+            access_payload = await decode_jwt_async(token=authorization.split(jwt_settings.access_token_type)[-1].strip())
+        except InvalidTokenError:
+            access_payload = None
+    await token_revocation_list.revoke_token(payload)
+    if access_payload is not None and access_payload.get("uid") == payload.get("uid"):
+        await token_revocation_list.revoke_token(access_payload)
+    return logout_response()
 
 
+@router.post('/logout-all')
+async def logout_all(
+    payload: dict[str, Any] = Depends(get_current_refresh_token_payload),
+) -> JSONResponse:
+    validate_token_type(payload=payload, token_type=jwt_settings.jwt_refresh_token_type)
+    # Отзываются все выданные пользователю токены на всех устройствах
+    await token_revocation_list.revoke_user(user_id=int(payload["uid"]))
+    return logout_response()
 
+
+def logout_response() -> JSONResponse:
+    response: JSONResponse = PreEncodedJSONResponse(content=LOGOUT_MESSAGE, status_code=status.HTTP_200_OK)
+    response.delete_cookie(
+        key=cookies_settings.refresh_token_name,
+        httponly=cookies_settings.httponly,
+        samesite=cookies_settings.samesite,
+        secure=cookies_settings.secure,
+    )
+    return response
+
+
+@jwks_router.get('/.well-known/jwks.json')
+async def jwks() -> Response:
+    # Набор ключей сериализуется один раз при загрузке связки ключей
+    return Response(
+        content=jwt_key_ring.jwks,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={jwt_settings.jwks_max_age}"},
+    )
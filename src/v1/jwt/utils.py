@@ -1,22 +1,54 @@
+import hashlib
+import time
+import uuid
+
 import bcrypt
 import jwt
-from src.v1.jwt.config import jwt_settings, cookies_settings
+from jwt.exceptions import InvalidTokenError
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes, PublicKeyTypes
+from src.cache import LRUCache
+from src.metrics import metrics_registry
+from src.v1.jwt.config import jwt_settings, cookies_settings, password_settings
+from src.v1.jwt.executor import crypto_executor
+from src.v1.jwt.keys import JWTKey, JWTKeyRing, jwt_key_ring
 from datetime import timedelta, datetime, UTC
 from src.schemas import UserSchema
 from starlette.responses import JSONResponse
 from typing import Any
 
+# Уже проверенные токены по sha256 дайджесту вместе с ключом проверки, запись живет до exp токена
+verified_token_cache: LRUCache[bytes, tuple[str | None, JWTKey, dict[str, Any]]] = LRUCache(
+    max_size=jwt_settings.verified_token_cache_size
+)
+metrics_registry.gauge_collector(
+    "verified_token_cache",
+    "Статистика кэша проверенных JWT",
+    lambda: [({"stat": stat}, value) for stat, value in verified_token_cache.stats().items()],
+)
+
 
 def encode_jwt(
     payload: dict[str, Any],
     expire_timedelta: timedelta,
-    private_key: str = jwt_settings.private_key_path.read_text(),
-    algorithm: str = jwt_settings.algorithm,
+    private_key: PrivateKeyTypes | str | None = None,
+    algorithm: str | None = None,
+    key_ring: JWTKeyRing = jwt_key_ring,
 ) -> str:
     to_encode = payload.copy()
     now: datetime = datetime.now(UTC)
     expire: datetime = now + expire_timedelta
     to_encode.update(iat=now, exp=expire)
+    # jti позволяет отозвать отдельный токен до истечения срока
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    # По умолчанию токен подписывается текущим ключом связки, kid указывает на него в JWKS
+    if private_key is None:
+        signing_key = key_ring.signing_key
+        return jwt.encode(
+            payload=to_encode,
+            key=signing_key.private_key,
+            algorithm=signing_key.algorithm,
+            headers={"kid": signing_key.kid},
+        )
     encoded_jwt = jwt.encode(payload=to_encode, key=private_key, algorithm=algorithm)
 
     return encoded_jwt
@@ -24,13 +56,44 @@ def encode_jwt(
 
 def decode_jwt(
     token: str | bytes,
-    public_key: str = jwt_settings.public_key_path.read_text(),
-    algorithm: str = jwt_settings.algorithm
+    public_key: PublicKeyTypes | str | None = None,
+    algorithm: str | None = None,
+    key_ring: JWTKeyRing = jwt_key_ring,
 ) -> dict[str, Any]:
-    decoded_jwt: dict[str, Any] = jwt.decode(jwt=token, key=public_key, algorithms=[algorithm])
+    # Явно переданный ключ проверяется напрямую, без связки ключей и кэша
+    if public_key is not None:
+        return jwt.decode(jwt=token, key=public_key, algorithms=[algorithm])
+
+    token_digest = hashlib.sha256(token.encode() if isinstance(token, str) else token).digest()
+    cached = verified_token_cache.get(token_digest)
+    if cached is not None:
+        cached_kid, cached_key, cached_jwt = cached
+        # Запись действительна, только пока этот ключ есть в переданной связке: токен, проверенный другой связкой
+        # или ключом, который уже убран из связки, проверяется заново
+        if key_ring.get_verification_key(cached_kid) is cached_key:
+            return cached_jwt.copy()
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    verification_key = key_ring.get_verification_key(kid)
+    if verification_key is None:
+        raise InvalidTokenError(f"Неизвестный kid {kid!r}")
+
+    decoded_jwt: dict[str, Any] = jwt.decode(
+        jwt=token, key=verification_key.public_key, algorithms=[verification_key.algorithm]
+    )
+
+    if "exp" in decoded_jwt:
+        ttl = float(decoded_jwt["exp"]) - time.time()
+        if ttl > 0:
+            verified_token_cache.set(token_digest, (kid, verification_key, decoded_jwt.copy()), ttl=ttl)
+
     return decoded_jwt
 
 
+async def decode_jwt_async(token: str | bytes, key_ring: JWTKeyRing = jwt_key_ring) -> dict[str, Any]:
+    return await crypto_executor.run(decode_jwt, token=token, key_ring=key_ring)
+
+
 def create_access_token(user: UserSchema) -> str:
     jwt_payload_access_token = {
         "type": jwt_settings.jwt_access_token_type,
@@ -82,10 +145,31 @@ def set_tokens_in_response(response: JSONResponse, user: UserSchema) -> JSONResp
     return response
 
 
-def hash_password(password: str) -> bytes:
-    salt: bytes = bcrypt.gensalt()
+async def set_tokens_in_response_async(response: JSONResponse, user: UserSchema) -> JSONResponse:
+    return await crypto_executor.run(set_tokens_in_response, response=response, user=user)
+
+
+def hash_password(password: str, rounds: int | None = None) -> bytes:
+    salt: bytes = bcrypt.gensalt(rounds=rounds or password_settings.bcrypt_rounds)
     return bcrypt.hashpw(password=password.encode(), salt=salt)
 
 
+def get_password_rounds(hashed_password: bytes) -> int:
+    # Формат хэша: $2b$<стоимость>$<соль и хэш>
+    return int(hashed_password.split(b"$")[2])
+
+
+def password_needs_rehash(hashed_password: bytes) -> bool:
+    return get_password_rounds(hashed_password) != password_settings.bcrypt_rounds
+
+
 def validate_password(password: str, hashed_password: bytes) -> bool:
-    return bcrypt.checkpw(password=password.encode(), hashed_password=hashed_password)
\ No newline at end of file
+    return bcrypt.checkpw(password=password.encode(), hashed_password=hashed_password)
+
+
+async def hash_password_async(password: str) -> bytes:
+    return await crypto_executor.run(hash_password, password=password)
+
+
+async def validate_password_async(password: str, hashed_password: bytes) -> bool:
+    return await crypto_executor.run(validate_password, password=password, hashed_password=hashed_password)
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends
+from starlette.responses import JSONResponse
+from src.responses import user_response
 from src.schemas import UserSchema
 from src.v1.jwt.dependencies import get_current_stuff_user_with_access_token
 
@@ -9,5 +11,5 @@ router = APIRouter()
 @router.get('/protected', response_model=UserSchema)
 async def protected(
         user: UserSchema = Depends(get_current_stuff_user_with_access_token),
-) -> UserSchema:
-    return user
\ No newline at end of file
+) -> JSONResponse:
+    return user_response(user)
\ No newline at end of file
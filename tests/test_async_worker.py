@@ -0,0 +1,129 @@
+import contextlib
+import datetime
+import json
+from typing import Any, AsyncIterator
+
+import aio_pika
+import pytest
+
+from src import async_worker
+from src.v1.email.config import email_settings
+from src.v1.email.tasks import flush_email_batch, send_email, send_email_verification_code
+
+
+class FakeMessage:
+    def __init__(self, task: str, kwargs: dict[str, Any], eta: str | None = None) -> None:
+        self.headers = {"task": task, "id": "1", "eta": eta}
+        self.body = json.dumps([[], kwargs, {}]).encode()
+        self.content_type = "application/json"
+        self.content_encoding = "utf-8"
+        self.correlation_id = "1"
+        self.reply_to = None
+        self.priority = 0
+        self.delivery_mode = aio_pika.DeliveryMode.PERSISTENT
+        self.acked = False
+
+    @contextlib.asynccontextmanager
+    async def process(self, ignore_processed: bool = False) -> AsyncIterator[None]:
+        yield
+        self.acked = True
+
+
+class FakeExchange:
+    def __init__(self) -> None:
+        self.published: list[tuple[aio_pika.Message, str]] = []
+
+    async def publish(self, message: aio_pika.Message, routing_key: str) -> None:
+        self.published.append((message, routing_key))
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list[dict[str, Any]]:
+    sent: list[dict[str, Any]] = []
+
+    async def send_email_async(**message: Any) -> bool:
+        sent.append(message)
+        return True
+
+    monkeypatch.setattr(async_worker, "send_email_async", send_email_async)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_known_task_is_sent_and_acked(sent: list[dict[str, Any]]) -> None:
+    exchange = FakeExchange()
+    message = FakeMessage(task=send_email_verification_code.name, kwargs={"receiver_email": "user@example.com", "code": "123456"})
+
+    await async_worker.TaskConsumer(exchange=exchange).handle_message(message)
+
+    assert [item["receiver_email"] for item in sent] == ["user@example.com"]
+    assert "123456" in sent[0]["body"]
+    assert message.acked
+    assert exchange.published == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_task_is_moved_to_dead_letter_queue(sent: list[dict[str, Any]]) -> None:
+    exchange = FakeExchange()
+    message = FakeMessage(task="src.tasks.unknown", kwargs={"value": 1})
+
+    await async_worker.TaskConsumer(exchange=exchange).handle_message(message)
+
+    assert sent == []
+    [(published, routing_key)] = exchange.published
+    assert routing_key == email_settings.async_worker_dead_letter_queue
+    assert published.body == message.body
+    assert published.headers["task"] == "src.tasks.unknown"
+    assert message.acked
+
+
+@pytest.mark.asyncio
+async def test_delayed_task_waits_in_delay_queue(sent: list[dict[str, Any]]) -> None:
+    exchange = FakeExchange()
+    eta = (datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=30)).isoformat()
+    message = FakeMessage(task=send_email_verification_code.name, kwargs={"receiver_email": "user@example.com", "code": "1"}, eta=eta)
+
+    await async_worker.TaskConsumer(exchange=exchange).handle_message(message)
+
+    assert sent == []
+    [(published, routing_key)] = exchange.published
+    assert routing_key.startswith(f"{email_settings.async_worker_delay_queue}.")
+    assert routing_key in async_worker.get_delay_queues().values()
+    assert published.expiration is None
+    assert message.acked
+
+
+@pytest.mark.asyncio
+async def test_short_delay_does_not_wait_behind_long_retry(sent: list[dict[str, Any]]) -> None:
+    exchange = FakeExchange()
+    consumer = async_worker.TaskConsumer(exchange=exchange)
+    now = datetime.datetime.now(datetime.UTC)
+    retry = FakeMessage(
+        task=send_email.name,
+        kwargs={"receiver_email": "user@example.com", "subject": "s", "body": "b"},
+        eta=(now + datetime.timedelta(seconds=30)).isoformat(),
+    )
+    flush = FakeMessage(task=flush_email_batch.name, kwargs={}, eta=(now + datetime.timedelta(seconds=0.2)).isoformat())
+
+    await consumer.handle_message(retry)
+    await consumer.handle_message(flush)
+
+    assert sent == []
+    assert retry.acked and flush.acked
+    delay_queues = {queue: ttl for ttl, queue in async_worker.get_delay_queues().items()}
+    (retry_message, retry_queue), (flush_message, flush_queue) = exchange.published
+    # У каждой очереди ожидания свой ttl, поэтому flush не стоит за повтором и ждет не дольше своей задержки
+    assert retry_queue != flush_queue
+    assert delay_queues[flush_queue] <= 200
+    assert delay_queues[retry_queue] <= 30_000
+    assert flush_message.body == flush.body and flush_message.expiration is None
+
+
+def test_broker_connection_params_follow_celery_broker() -> None:
+    params = async_worker.get_broker_connection_params()
+
+    with async_worker.celery_app.connection_for_write() as connection:
+        assert params["host"] == connection.hostname
+        assert params["port"] == connection.port
+    assert params["login"] and params["password"]
+    assert params["virtualhost"] == "/"
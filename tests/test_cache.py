@@ -0,0 +1,27 @@
+import time
+
+from src.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[int, str] = LRUCache(max_size=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries() -> None:
+    cache: LRUCache[int, str] = LRUCache(max_size=2, ttl=0.01)
+    cache.set(1, "a")
+    time.sleep(0.02)
+
+    assert cache.get(1) is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import bindparam, create_engine, literal_column, select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from src.database import TimedAsyncAdaptedQueuePool, create_compiled_cache, get_compiled_cache_stats, get_pool_stats
+from src.metrics import db_compiled_cache_total, instrument_engine
+
+
+class FakeDBAPIConnection:
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def create_pool(connect_delay: float = 0.0) -> TimedAsyncAdaptedQueuePool:
+    def creator() -> FakeDBAPIConnection:
+        time.sleep(connect_delay)
+        return FakeDBAPIConnection()
+
+    return TimedAsyncAdaptedQueuePool(creator, pool_size=1, max_overflow=0, timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_pool_measures_only_queue_waits_per_pool() -> None:
+    pool = create_pool(connect_delay=0.3)
+    other_pool = create_pool()
+
+    # Открытие нового соединения не считается ожиданием пула
+    first = await greenlet_spawn(pool.connect)
+    assert pool.wait_stats.acquired == 1
+    assert pool.wait_stats.max_wait_seconds == 0
+
+    with pytest.raises(PoolTimeoutError):
+        await greenlet_spawn(pool.connect)
+    assert pool.wait_stats.timeouts == 1
+    assert 0.1 <= pool.wait_stats.max_wait_seconds < 0.3
+
+    waiter = asyncio.create_task(greenlet_spawn(pool.connect))
+    await asyncio.sleep(0.02)
+    assert pool.wait_stats.waiting == 1
+    first.close()
+    (await waiter).close()
+
+    stats = get_pool_stats(SimpleNamespace(pool=pool))
+    assert (stats["checked_out"], stats["idle"]) == (0, 1)
+    assert stats["wait"]["waiting"] == 0
+    assert stats["wait"]["acquired"] == 2
+    assert stats["wait"]["timeouts"] == 1
+    assert get_pool_stats(SimpleNamespace(pool=other_pool))["wait"]["acquired"] == 0
+
+
+def test_compiled_cache_stats_are_reported_per_engine() -> None:
+    engine = create_engine("sqlite://", execution_options={"compiled_cache": create_compiled_cache("test")})
+    instrument_engine(engine, name="test")
+    statement = select(literal_column("1")).where(literal_column("1") == bindparam("value"))
+
+    with engine.connect() as connection:
+        for value in range(3):
+            connection.execute(statement, {"value": value})
+
+    assert db_compiled_cache_total.values()[("test", "SELECT", "cache_miss")] == 1
+    assert db_compiled_cache_total.values()[("test", "SELECT", "cache_hit")] == 2
+    stats = get_compiled_cache_stats()
+    assert stats["test"]["size"] == 1
+    assert stats["test"]["hit_ratio"] == 2 / 3
+    assert "primary" in stats
@@ -0,0 +1,61 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.load_shedding import LoadShedder, LoadSheddingMiddleware
+
+
+def create_client(shedder: LoadShedder) -> TestClient:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        shedder.monitor.start()
+        yield
+        await shedder.monitor.stop()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/v1/email/ping")
+    async def email_ping() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/v1/auth/protected")
+    async def protected() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/v1/auth/block")
+    def block() -> dict[str, str]:
+        return {"status": "ok"}
+
+    app.add_middleware(LoadSheddingMiddleware, shedder=shedder)
+    return TestClient(app)
+
+
+def test_low_priority_routes_are_shed_first() -> None:
+    shedder = LoadShedder(max_lag_ms=100, max_in_flight=10, probe_interval=0.01)
+    client = create_client(shedder)
+    assert client.get("/v1/email/ping").status_code == 200
+
+    # Число запросов в обработке выше порога низкого приоритета, но ниже порога высокого
+    shedder.in_flight = 6
+    response = client.get("/v1/email/ping")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert client.get("/v1/auth/protected").status_code == 200
+
+
+def test_event_loop_lag_sheds_by_priority() -> None:
+    shedder = LoadShedder(max_lag_ms=100, max_in_flight=10, probe_interval=60)
+    with create_client(shedder) as client:
+        assert client.get("/v1/email/ping").status_code == 200
+
+        # Имитация заблокированного event loop: задача замера опаздывает на 250 мс
+        shedder.monitor.next_tick = time.monotonic() - 0.25
+        assert client.get("/v1/email/ping").status_code == 503
+        assert client.get("/v1/auth/block").status_code == 503
+        assert client.get("/v1/auth/protected").status_code == 200
+
+    # После остановки приложения замер задержки выключен и не сбрасывает запросы
+    assert shedder.monitor.current_lag() == 0.0
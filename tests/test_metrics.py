@@ -0,0 +1,32 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.metrics import MetricsMiddleware, metrics_registry, router
+
+
+app = FastAPI()
+app.include_router(router=router)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get('/items/{item_id}')
+async def item(item_id: int) -> dict[str, int]:
+    return {"id": item_id}
+
+
+client = TestClient(app)
+
+
+def test_metrics_record_route_templates_and_statuses() -> None:
+    client.get('/items/1')
+    client.get('/items/2')
+    client.get('/missing')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in response.text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2' in response.text
+    assert "http_request_duration_seconds_bucket" in response.text
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import fakeredis
+import pytest
+from fakeredis.aioredis import FakeConnection
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.asyncio import BlockingConnectionPool
+
+import src.redis_pool
+from src.config import RateLimitRule
+from src.rate_limit import RateLimitMiddleware
+from src.v1.jwt.config import cookies_settings
+from src.v1.jwt.utils import encode_jwt
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr(
+        src.redis_pool,
+        "redis_connection_pool",
+        BlockingConnectionPool(server=fakeredis.FakeServer(), connection_class=FakeConnection, decode_responses=True),
+    )
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login(data: dict) -> dict:
+        return data
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        rules=[
+            RateLimitRule(method="POST", path="/login", key="ip", limit=3, period=60),
+            RateLimitRule(method="POST", path="/login", key="email", limit=2, period=60),
+        ],
+    )
+    return TestClient(app)
+
+
+def test_rate_limit_per_email_and_ip(client: TestClient) -> None:
+    for _ in range(2):
+        response = client.post("/login", json={"email": "User@example.com"})
+        assert response.status_code == 200
+        assert response.json() == {"email": "User@example.com"}
+
+    response = client.post("/login", json={"email": "user@example.com"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
+
+    # Отклоненный запрос не расходует токены корзины по ip
+    assert client.post("/login", json={"email": "other@example.com"}).status_code == 200
+    assert client.post("/login", json={"email": "third@example.com"}).status_code == 429
+
+
+def test_rate_limit_per_verified_token_uid(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        src.redis_pool,
+        "redis_connection_pool",
+        BlockingConnectionPool(server=fakeredis.FakeServer(), connection_class=FakeConnection, decode_responses=True),
+    )
+    app = FastAPI()
+
+    @app.post("/refresh")
+    async def refresh() -> dict:
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, rules=[RateLimitRule(method="POST", path="/refresh", key="uid", limit=1, period=60)])
+    client = TestClient(app)
+
+    def post(uid: int) -> int:
+        client.cookies.set(cookies_settings.refresh_token_name, encode_jwt(payload={"uid": uid}, expire_timedelta=timedelta(minutes=1)))
+        return client.post("/refresh").status_code
+
+    assert [post(uid=1), post(uid=1), post(uid=2)] == [200, 429, 200]
+    # Неподписанный токен не дает ключа, такой запрос ограничивается только остальными правилами
+    client.cookies.set(cookies_settings.refresh_token_name, "not-a-token")
+    assert client.post("/refresh").status_code == 200
@@ -0,0 +1,43 @@
+import datetime
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.responses import FastJSONResponse, PreEncodedJSONResponse, pre_encode, user_response
+from src.schemas import UserPasswordSchema, UserSchema
+
+
+def create_user() -> UserPasswordSchema:
+    now = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    return UserPasswordSchema(
+        id=1, email="user@example.com", first_name="Иван", is_admin=False, is_stuff=False, is_active=True,
+        created_at=now, updated_at=now, password=b"hash",
+    )
+
+
+def test_user_response_matches_response_model() -> None:
+    user = create_user()
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/model", response_model=UserSchema)
+    async def model() -> UserSchema:
+        return user
+
+    @app.get("/fast", response_model=UserSchema)
+    async def fast() -> PreEncodedJSONResponse:
+        return user_response(user)
+
+    client = TestClient(app)
+    expected = client.get("/model").json()
+    response = client.get("/fast")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected
+    assert "password" not in response.json()
+
+
+def test_pre_encoded_body_is_sent_as_is() -> None:
+    body = pre_encode({"message": "Токены успешно обновлены."})
+    response = PreEncodedJSONResponse(content=body, status_code=201)
+    assert response.body is body
+    assert json.loads(response.body) == {"message": "Токены успешно обновлены."}
@@ -0,0 +1,29 @@
+import importlib.util
+
+import pytest
+
+from src import server
+from src.config import web_settings
+
+
+def test_auto_loop_and_http_fall_back_when_not_installed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(web_settings, "WEBAPP_LOOP", "auto")
+    monkeypatch.setattr(web_settings, "WEBAPP_HTTP", "auto")
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    assert server.resolve_loop() == "asyncio"
+    assert server.resolve_http() == "h11"
+
+
+def test_explicit_loop_and_http_are_kept(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(web_settings, "WEBAPP_LOOP", "asyncio")
+    monkeypatch.setattr(web_settings, "WEBAPP_HTTP", "h11")
+    assert server.resolve_loop() == "asyncio"
+    assert server.resolve_http() == "h11"
+
+
+def test_workers_default_to_cpu_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(web_settings, "WEBAPP_WORKERS", 0)
+    monkeypatch.setattr(server.os, "cpu_count", lambda: 3)
+    assert server.get_workers_count() == 3
+    monkeypatch.setattr(web_settings, "WEBAPP_WORKERS", 2)
+    assert server.get_workers_count() == 2
@@ -0,0 +1,19 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.startup import readiness, router
+
+
+def test_ready_flips_after_warm_up() -> None:
+    app = FastAPI()
+    app.include_router(router=router)
+    client = TestClient(app)
+
+    readiness.set_not_ready()
+    assert client.get("/ready").status_code == 503
+
+    readiness.set_ready()
+    assert client.get("/ready").status_code == 200
+
+    readiness.set_not_ready()
+    assert client.get("/ready").status_code == 503
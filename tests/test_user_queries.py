@@ -0,0 +1,82 @@
+import datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.interfaces import CacheStats
+
+from src.models import UserModel
+from src.schemas import UserPasswordSchema, UserSchema
+from src.utils import get_user_statement, select_user
+
+
+class RowResult:
+    def __init__(self, row: dict[str, Any] | None) -> None:
+        self.row = row
+
+    def mappings(self) -> "RowResult":
+        return self
+
+    def one_or_none(self) -> dict[str, Any] | None:
+        return self.row
+
+
+class RecordingSession:
+    def __init__(self, row: dict[str, Any] | None) -> None:
+        self.info: dict[str, Any] = {}
+        self.row = row
+        self.statements: list[str] = []
+        self.params: list[dict[str, Any]] = []
+
+    async def execute(self, statement: Any, params: dict[str, Any]) -> RowResult:
+        self.statements.append(str(statement))
+        self.params.append(params)
+        columns = {column.name for column in statement.selected_columns}
+        return RowResult(None if self.row is None else {key: value for key, value in self.row.items() if key in columns})
+
+
+def create_row() -> dict[str, Any]:
+    now = datetime.datetime(2025, 1, 1)
+    return {
+        "id": 1, "email": "user@example.com", "first_name": "Иван", "is_admin": False, "is_stuff": False,
+        "is_active": True, "created_at": now, "updated_at": now, "password": b"hash",
+    }
+
+
+@pytest.mark.asyncio
+async def test_select_user_fetches_password_only_when_requested() -> None:
+    session = RecordingSession(create_row())
+
+    user = await select_user(session=session, email="user@example.com")
+    assert type(user) is UserSchema
+    assert "password" not in session.statements[0]
+
+    user = await select_user(session=session, get_password=True, email="user@example.com")
+    assert type(user) is UserPasswordSchema
+    assert user.password == b"hash"
+    assert "users.password" in session.statements[1]
+    assert session.params == [{"email": "user@example.com"}, {"email": "user@example.com"}]
+
+
+@pytest.mark.asyncio
+async def test_select_user_returns_none_for_missing_user() -> None:
+    assert await select_user(session=RecordingSession(None), id=1) is None
+
+
+def test_user_statements_are_built_once_per_filter_shape() -> None:
+    statement = get_user_statement(projection="user", filter_names=("id",))
+    assert get_user_statement(projection="user", filter_names=("id",)) is statement
+    assert get_user_statement(projection="user", filter_names=("email",)) is not statement
+
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        # Серверные значения по умолчанию из модели есть только в postgres
+        connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT, password BLOB, first_name TEXT,"
+            " is_admin BOOLEAN, is_stuff BOOLEAN, is_active BOOLEAN, created_at DATETIME, updated_at DATETIME)"
+        ))
+        connection.execute(UserModel.__table__.insert(), create_row())
+        first = connection.execute(statement, {"id": 1})
+        second = connection.execute(statement, {"id": 2})
+    assert first.mappings().one()["email"] == "user@example.com"
+    assert second.context.cache_hit is CacheStats.CACHE_HIT
@@ -0,0 +1,62 @@
+import contextlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import bcrypt
+import pytest
+
+from src.user_transfer import UserImporter, get_rejects_path, read_rows
+
+
+class FakeConnection:
+    def __init__(self, existing_emails: set[str]) -> None:
+        self.existing_emails = existing_emails
+        self.records: list[tuple[Any, ...]] = []
+
+    def transaction(self) -> contextlib.AbstractAsyncContextManager[None]:
+        return contextlib.nullcontext()
+
+    async def copy_records_to_table(self, table: str, records: list[tuple[Any, ...]], columns: tuple[str, ...]) -> None:
+        self.records = records
+
+    async def fetch(self, query: str) -> list[dict[str, str]]:
+        return [{"email": record[0]} for record in self.records if record[0] not in self.existing_emails]
+
+
+@pytest.mark.asyncio
+async def test_import_hashes_passwords_and_reports_rejected_rows() -> None:
+    pre_hashed = bcrypt.hashpw(b"secret-password", bcrypt.gensalt(rounds=4)).decode()
+    file = io.StringIO(
+        "email,first_name,password,password_hash,is_admin\n"
+        "new@example.com,Иван,password123,,f\n"
+        f"hashed@example.com,Петр,,{pre_hashed},t\n"
+        "taken@example.com,Анна,password123,,\n"
+        "not-an-email,Олег,password123,,\n"
+        "short@example.com,Олег,123,,\n"
+        "new@example.com,Иван,password123,,\n"
+    )
+    rejects = io.StringIO()
+    connection = FakeConnection(existing_emails={"taken@example.com"})
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        importer = UserImporter(connection=connection, pool=pool, workers=2, rounds=4, rejects=rejects)
+        await importer.copy(await importer.prepare(read_rows(file, "csv")))
+
+    assert (importer.processed, importer.imported, importer.rejected) == (6, 2, 4)
+    records = {record[0]: record for record in connection.records}
+    assert bcrypt.checkpw(b"password123", records["new@example.com"][1])
+    assert records["hashed@example.com"][1] == pre_hashed.encode()
+    assert records["hashed@example.com"][3] is True
+    assert [json.loads(line)["line"] for line in rejects.getvalue().splitlines()] == [5, 6, 7, 4]
+
+
+def test_ndjson_rows_that_cannot_be_parsed_are_kept_for_the_report() -> None:
+    file = io.StringIO('{"email": "user@example.com"}\n\nnot json\n[1]\n')
+    assert list(read_rows(file, "ndjson")) == [(1, {"email": "user@example.com"}), (3, None), (4, None)]
+
+
+def test_rejects_default_to_a_file_next_to_the_import() -> None:
+    assert get_rejects_path(Path("data/users.csv")) == Path("data/users.csv.rejects.ndjson")
@@ -0,0 +1,91 @@
+from datetime import timedelta
+from typing import Any
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from src.exceptions import too_many_requests_exception
+from src.v1.auth.exceptions import current_user_yet_exists_exception
+from src.v1.auth.router import signup
+from src.v1.email.codes import CodeStatus, OneTimeCodeStore, reset_password_key_store, verification_code_store
+from src.v1.email.router import reset_password, verification_code
+from src.v1.email.schemas import EmailPasswordFirstNameVerificationCodeSchema, EmailPasswordSchema, EmailSchema
+
+
+@pytest.fixture
+def store() -> OneTimeCodeStore:
+    return OneTimeCodeStore(
+        name="code", ttl=timedelta(minutes=2), resend_cooldown=timedelta(minutes=1), max_attempts=3, secret="secret"
+    )
+
+
+@pytest.mark.asyncio
+async def test_code_is_consumed_once(store: OneTimeCodeStore) -> None:
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    assert await store.issue(redis=redis, email="User@example.com", code="123456") == 0
+    assert "123456" not in str(await redis.hgetall("code:user@example.com"))
+
+    assert await store.consume(redis=redis, email="user@example.com", code="123456") == CodeStatus.VALID
+    assert await store.consume(redis=redis, email="user@example.com", code="123456") == CodeStatus.MISSING
+
+
+@pytest.mark.asyncio
+async def test_code_locks_after_failed_attempts_and_respects_cooldown(store: OneTimeCodeStore) -> None:
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await store.issue(redis=redis, email="user@example.com", code="123456")
+
+    assert await store.issue(redis=redis, email="user@example.com", code="654321") > 0
+    assert await store.consume(redis=redis, email="user@example.com", code="000000") == CodeStatus.INVALID
+    assert await store.consume(redis=redis, email="user@example.com", code="000001") == CodeStatus.INVALID
+    assert await store.consume(redis=redis, email="user@example.com", code="000002") == CodeStatus.LOCKED
+    assert await store.consume(redis=redis, email="user@example.com", code="123456") == CodeStatus.LOCKED
+
+
+class FailingSession:
+    def add(self, user: Any) -> None:
+        pass
+
+    async def commit(self) -> None:
+        raise IntegrityError("INSERT INTO users", {}, Exception("duplicate key"))
+
+
+@pytest.mark.asyncio
+async def test_signup_keeps_code_when_user_is_not_created() -> None:
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await verification_code_store.issue(redis=redis, email="user@example.com", code="123456")
+    user_data = EmailPasswordFirstNameVerificationCodeSchema(
+        email="user@example.com", password="password123", first_name="Иван", email_code="123456"
+    )
+
+    with pytest.raises(HTTPException) as error:
+        await signup(session=FailingSession(), user_data=user_data, redis_pool=redis)
+    assert error.value is current_user_yet_exists_exception
+    assert await verification_code_store.consume(
+        redis=redis, email="user@example.com", code="123456"
+    ) == CodeStatus.VALID
+
+
+class UnusedSession:
+    async def execute(self, *args: Any, **kwargs: Any) -> None:
+        raise AssertionError("запрос в базу данных во время паузы")
+
+
+@pytest.mark.asyncio
+async def test_resend_during_cooldown_is_rejected_before_user_lookup() -> None:
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await verification_code_store.issue(redis=redis, email="user@example.com", code="123456")
+    await reset_password_key_store.issue(redis=redis, email="user@example.com", code="key")
+    assert await verification_code_store.cooldown(redis=redis, email="User@example.com") > 0
+
+    with pytest.raises(HTTPException) as error:
+        await verification_code(
+            session=UnusedSession(),
+            user_data=EmailPasswordSchema(email="user@example.com", password="password123"),
+            redis_pool=redis,
+        )
+    assert error.value is too_many_requests_exception
+    with pytest.raises(HTTPException) as error:
+        await reset_password(session=UnusedSession(), user_data=EmailSchema(email="user@example.com"), redis_pool=redis)
+    assert error.value is too_many_requests_exception
@@ -2,6 +2,8 @@ from fastapi.testclient import TestClient
 from src.v1.email import router
 import json
 
+import pytest
+
 
 client = TestClient(router)
 
@@ -38,4 +40,217 @@ def test_send_emails():
             "password": password,
         },
         is_active=True
-    )
\ No newline at end of file
+    )
+
+class FakeSMTP:
+    instances: list["FakeSMTP"] = []
+
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self.sent: list[str] = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self) -> None:
+        pass
+
+    def login(self, user: str, password: str) -> None:
+        pass
+
+    def noop(self) -> tuple[int, bytes]:
+        return (250, b"OK")
+
+    def sendmail(self, from_addr: str, to_addrs: str, msg: str) -> dict:
+        self.sent.append(msg)
+        return {}
+
+    def quit(self) -> None:
+        self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_smtp_connection_pool_reuses_and_recycles_sessions(monkeypatch) -> None:
+    from src.v1.email import smtp
+
+    monkeypatch.setattr(smtp.smtplib, "SMTP", FakeSMTP)
+    FakeSMTP.instances = []
+    pool = smtp.SMTPConnectionPool(
+        host="localhost", port=25, user="user", password="password", size=1,
+        max_messages_per_connection=2, max_connection_age=60, timeout=1,
+    )
+
+    for number in range(3):
+        pool.sendmail("from@example.com", "to@example.com", f"message {number}")
+
+    assert len(FakeSMTP.instances) == 2
+    assert FakeSMTP.instances[0].sent == ["message 0", "message 1"]
+    assert FakeSMTP.instances[0].closed
+    assert FakeSMTP.instances[1].sent == ["message 2"]
+    pool.close()
+
+
+def test_send_email_batch_uses_one_session_and_retries_failures(monkeypatch) -> None:
+    import smtplib
+    from src.v1.email import smtp, tasks
+
+    class RefusingSMTP(FakeSMTP):
+        def sendmail(self, from_addr: str, to_addrs: str, msg: str) -> dict:
+            if to_addrs == "bad@example.com":
+                raise smtplib.SMTPRecipientsRefused({to_addrs: (550, b"No such user")})
+            return super().sendmail(from_addr, to_addrs, msg)
+
+    retried: list[dict] = []
+    monkeypatch.setattr(smtp.smtplib, "SMTP", RefusingSMTP)
+    monkeypatch.setattr(tasks.send_email, "apply_async", lambda kwargs, countdown: retried.append(kwargs))
+    FakeSMTP.instances = []
+    pool = smtp.SMTPConnectionPool(
+        host="localhost", port=25, user="user", password="password", size=1,
+        max_messages_per_connection=100, max_connection_age=60, timeout=1,
+    )
+    monkeypatch.setattr(tasks, "smtp_connection_pool", pool)
+
+    results = tasks.send_email_batch(messages=[
+        {"receiver_email": "first@example.com", "subject": "s", "body": "b"},
+        {"receiver_email": "bad@example.com", "subject": "s", "body": "b"},
+        {"receiver_email": "second@example.com", "subject": "s", "body": "b"},
+    ])
+
+    assert len(FakeSMTP.instances) == 1
+    assert [result["status"] for result in results] == ["sent", "failed", "sent"]
+    assert retried == [{"receiver_email": "bad@example.com", "subject": "s", "body": "b"}]
+    pool.close()
+
+
+def test_email_template_substitutes_escaped_value() -> None:
+    from src.v1.email.templates import get_email_template
+
+    template = get_email_template(name="verification_code.html", variable="code")
+
+    assert template.parts is not None
+    html = template.render("12<456")
+    assert "<b>12&lt;456</b>" in html
+    assert html == template.template.render(code="12<456", **template.static_context)
+
+
+class FakeAsyncSMTP:
+    instances: list["FakeAsyncSMTP"] = []
+
+    def __init__(self, hostname: str, port: int, timeout: float, start_tls: bool) -> None:
+        self.sent: list[str] = []
+        self.closed = False
+        self.alive = True
+        self.disconnect_on_send = False
+        FakeAsyncSMTP.instances.append(self)
+
+    async def connect(self) -> None:
+        pass
+
+    async def login(self, user: str, password: str) -> None:
+        pass
+
+    async def noop(self):
+        import aiosmtplib
+
+        if not self.alive:
+            raise aiosmtplib.SMTPServerDisconnected("connection lost")
+        return aiosmtplib.SMTPResponse(250, "OK")
+
+    async def sendmail(self, from_addr: str, to_addrs: str, msg: str) -> tuple[dict, str]:
+        import aiosmtplib
+
+        if self.disconnect_on_send:
+            raise aiosmtplib.SMTPServerDisconnected("connection lost")
+        self.sent.append(msg)
+        return {}, "OK"
+
+    async def quit(self) -> None:
+        self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def create_async_pool(monkeypatch, max_messages_per_connection: int):
+    from src.v1.email import smtp
+
+    monkeypatch.setattr(smtp.aiosmtplib, "SMTP", FakeAsyncSMTP)
+    FakeAsyncSMTP.instances = []
+    return smtp.AsyncSMTPConnectionPool(
+        host="localhost", port=25, user="user", password="password", size=1,
+        max_messages_per_connection=max_messages_per_connection, max_connection_age=60, timeout=1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_smtp_connection_pool_reuses_and_recycles_sessions(monkeypatch) -> None:
+    pool = create_async_pool(monkeypatch, max_messages_per_connection=2)
+
+    for number in range(3):
+        await pool.sendmail("from@example.com", "to@example.com", f"message {number}")
+
+    assert len(FakeAsyncSMTP.instances) == 2
+    assert FakeAsyncSMTP.instances[0].sent == ["message 0", "message 1"]
+    assert FakeAsyncSMTP.instances[0].closed
+    assert FakeAsyncSMTP.instances[1].sent == ["message 2"]
+    await pool.close()
+    assert FakeAsyncSMTP.instances[1].closed
+
+
+@pytest.mark.asyncio
+async def test_async_smtp_connection_pool_reconnects_lost_sessions(monkeypatch) -> None:
+    pool = create_async_pool(monkeypatch, max_messages_per_connection=100)
+
+    await pool.sendmail("from@example.com", "to@example.com", "message 0")
+    # Соединение оборвалось, пока лежало в пуле: NOOP не проходит
+    FakeAsyncSMTP.instances[0].alive = False
+    await pool.sendmail("from@example.com", "to@example.com", "message 1")
+    # Сервер закрыл соединение уже после NOOP: письмо отправляется повторно на новом
+    FakeAsyncSMTP.instances[1].disconnect_on_send = True
+    await pool.sendmail("from@example.com", "to@example.com", "message 2")
+
+    assert [instance.sent for instance in FakeAsyncSMTP.instances] == [["message 0"], ["message 1"], ["message 2"]]
+    assert FakeAsyncSMTP.instances[0].closed and FakeAsyncSMTP.instances[1].closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_email_schedules_flush_until_marker_is_cleared(monkeypatch) -> None:
+    import fakeredis
+    from src.v1.email import tasks
+    from src.v1.email.config import email_settings
+
+    scheduled: list[float] = []
+    monkeypatch.setattr(tasks.flush_email_batch, "apply_async", lambda countdown: scheduled.append(countdown))
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    sync_redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(tasks, "get_batch_redis", lambda: sync_redis)
+    monkeypatch.setattr(tasks, "send_email_batch", lambda messages: [])
+
+    await tasks.enqueue_email(redis_pool=redis, receiver_email="first@example.com", subject="s", body="b")
+    await tasks.enqueue_email(redis_pool=redis, receiver_email="second@example.com", subject="s", body="b")
+    assert scheduled == [email_settings.batch_max_delay.total_seconds()]
+
+    # Задача разобрала очередь и сняла метку, следующее письмо ставит новую задачу
+    tasks.flush_email_batch()
+    await tasks.enqueue_email(redis_pool=redis, receiver_email="third@example.com", subject="s", body="b")
+    assert len(scheduled) == 2
+
+
+@pytest.mark.asyncio
+async def test_enqueue_email_clears_marker_when_publish_fails(monkeypatch) -> None:
+    import fakeredis
+    from src.v1.email import tasks
+    from src.v1.email.config import email_settings
+
+    def fail(countdown: float) -> None:
+        raise ConnectionError("broker is down")
+
+    monkeypatch.setattr(tasks.flush_email_batch, "apply_async", fail)
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    with pytest.raises(ConnectionError):
+        await tasks.enqueue_email(redis_pool=redis, receiver_email="user@example.com", subject="s", body="b")
+    assert not await redis.exists(email_settings.batch_scheduled_redis_key)
+    assert await redis.llen(email_settings.batch_redis_key) == 1
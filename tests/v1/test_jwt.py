@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from datetime import timedelta
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi import HTTPException
+from jwt.exceptions import InvalidTokenError
+
+from src.v1.jwt.config import password_settings
+from src.v1.jwt.executor import CryptoExecutor
+from src.v1.jwt.keys import JWTKeyRing, create_jwt_key
+from src.v1.jwt.utils import (
+    decode_jwt,
+    encode_jwt,
+    get_password_rounds,
+    hash_password,
+    password_needs_rehash,
+    validate_password,
+)
+
+
+@pytest.mark.asyncio
+async def test_crypto_executor_runs_off_event_loop() -> None:
+    executor = CryptoExecutor(max_workers=1, max_pending=4)
+    loop_thread = threading.get_ident()
+
+    thread = await executor.run(threading.get_ident)
+
+    assert thread != loop_thread
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_crypto_executor_rejects_when_saturated() -> None:
+    executor = CryptoExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    blocked = asyncio.create_task(executor.run(release.wait, 5))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await executor.run(threading.get_ident)
+    assert exc_info.value.status_code == 503
+
+    release.set()
+    await blocked
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_password_rehash_detects_cost_change(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(password_settings, "bcrypt_rounds", 4)
+    hashed_password = hash_password(password="password")
+
+    assert get_password_rounds(hashed_password) == 4
+    assert validate_password(password="password", hashed_password=hashed_password)
+    assert not password_needs_rehash(hashed_password)
+
+    monkeypatch.setattr(password_settings, "bcrypt_rounds", 5)
+    assert password_needs_rehash(hashed_password)
+
+
+def test_verified_token_cache_is_bound_to_the_key_ring() -> None:
+    old_key, new_key = (
+        create_jwt_key(public_key=private_key.public_key(), private_key=private_key)
+        for private_key in (ed25519.Ed25519PrivateKey.generate(), ed25519.Ed25519PrivateKey.generate())
+    )
+    rotating_ring = JWTKeyRing(signing_key=new_key, verification_keys=[old_key])
+    token = encode_jwt(
+        payload={"uid": 1}, expire_timedelta=timedelta(minutes=1),
+        key_ring=JWTKeyRing(signing_key=old_key, verification_keys=[]),
+    )
+
+    assert decode_jwt(token=token, key_ring=rotating_ring)["uid"] == 1
+    assert decode_jwt(token=token, key_ring=rotating_ring)["uid"] == 1
+    # Проверенный раньше токен не принимается связкой, в которой нет его ключа
+    with pytest.raises(InvalidTokenError):
+        decode_jwt(token=token, key_ring=JWTKeyRing(signing_key=new_key, verification_keys=[]))
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from src.v1.jwt.config import jwt_settings
+from src.v1.jwt.exceptions import crypto_executor_overloaded_exception
+from src.v1.jwt.executor import crypto_executor
+from src.v1.jwt.revocation import TokenRevocationList, token_revocation_list
+from src.v1.jwt.router import logout
+from src.v1.jwt.utils import encode_jwt
+
+
+def create_revocation_list(server: fakeredis.FakeServer) -> TokenRevocationList:
+    revocation_list = TokenRevocationList(prefix="revoked", reconnect_delay=0.01, prune_interval=60, max_token_lifetime=3600)
+    revocation_list._redis = lambda: fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    return revocation_list
+
+
+@pytest.mark.asyncio
+async def test_revocations_reach_other_processes_over_pubsub() -> None:
+    server = fakeredis.FakeServer()
+    listener = create_revocation_list(server)
+    writer = create_revocation_list(server)
+    payload = {"jti": "a", "uid": 1, "iat": int(time.time()), "exp": time.time() + 60}
+    await writer.revoke_token({"jti": "old", "uid": 2, "iat": int(time.time()), "exp": time.time() + 60})
+
+    await listener.start()
+    try:
+        # Отзыв, сделанный до запуска, загружается из redis
+        assert listener.is_revoked({"jti": "old", "uid": 2})
+        while not listener.is_synced:
+            await asyncio.sleep(0.01)
+        assert not listener.is_revoked(payload)
+
+        await writer.revoke_token(payload)
+        await writer.revoke_user(user_id=3)
+        for _ in range(100):
+            if listener.is_revoked(payload) and 3 in listener.not_before:
+                break
+            await asyncio.sleep(0.01)
+        assert listener.is_revoked(payload)
+        assert listener.is_revoked({"jti": "b", "uid": 3, "iat": int(time.time()) - 10})
+        assert not listener.is_revoked({"jti": "c", "uid": 4, "iat": int(time.time()) - 10})
+    finally:
+        await listener.stop()
+
+
+def test_expired_revocations_are_pruned() -> None:
+    revocation_list = TokenRevocationList(prefix="revoked", reconnect_delay=1, prune_interval=60, max_token_lifetime=10)
+    revocation_list.apply_event(f"jti:{time.time() + 60}:a")
+    revocation_list.apply_event(f"jti:{time.time() - 1}:b")
+    revocation_list.apply_event(f"user:{int(time.time()) - 20}:1")
+    revocation_list.revoked_jtis["c"] = time.time() - 1
+
+    revocation_list.prune()
+
+    assert set(revocation_list.revoked_jtis) == {"a"}
+    assert revocation_list.not_before == {}
+
+
+@pytest.mark.asyncio
+async def test_revoke_user_covers_tokens_issued_in_the_same_second() -> None:
+    revocation_list = create_revocation_list(fakeredis.FakeServer())
+    issued_at = int(time.time())
+
+    await revocation_list.revoke_user(user_id=1)
+
+    assert revocation_list.is_revoked({"jti": "a", "uid": 1, "iat": issued_at})
+    assert not revocation_list.is_revoked({"jti": "b", "uid": 1, "iat": issued_at + 2})
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_only_access_token_of_the_same_user(monkeypatch: pytest.MonkeyPatch) -> None:
+    revoked: list[str] = []
+
+    async def revoke_token(payload: dict) -> None:
+        revoked.append(payload["jti"])
+
+    monkeypatch.setattr(token_revocation_list, "revoke_token", revoke_token)
+    refresh_payload = {"type": jwt_settings.jwt_refresh_token_type, "uid": 1, "jti": "refresh"}
+
+    def authorization(uid: int, jti: str) -> str:
+        token = encode_jwt(payload={"uid": uid, "jti": jti}, expire_timedelta=timedelta(minutes=1))
+        return f"{jwt_settings.access_token_type} {token}"
+
+    await logout(payload=refresh_payload, authorization=authorization(uid=2, jti="other"))
+    await logout(payload=refresh_payload, authorization=authorization(uid=1, jti="own"))
+
+    assert revoked == ["refresh", "refresh", "own"]
+
+
+@pytest.mark.asyncio
+async def test_logout_keeps_refresh_token_when_crypto_executor_is_overloaded(monkeypatch: pytest.MonkeyPatch) -> None:
+    revoked: list[str] = []
+
+    async def revoke_token(payload: dict) -> None:
+        revoked.append(payload["jti"])
+
+    async def run(*args, **kwargs) -> None:
+        raise crypto_executor_overloaded_exception
+
+    monkeypatch.setattr(token_revocation_list, "revoke_token", revoke_token)
+    monkeypatch.setattr(crypto_executor, "run", run)
+    refresh_payload = {"type": jwt_settings.jwt_refresh_token_type, "uid": 1, "jti": "refresh"}
+
+    with pytest.raises(HTTPException) as error:
+        await logout(payload=refresh_payload, authorization=f"{jwt_settings.access_token_type} token")
+    assert error.value is crypto_executor_overloaded_exception
+    # Ничего не отозвано, поэтому повторный выход пройдет полностью
+    assert revoked == []